@@ -1,10 +1,16 @@
+import time
+
 import streamlit as st
-import pickle
-import numpy as np
-import plotly.graph_objects as go
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from diagnosis import drift, features, profiling, risk, rollout, store
+from diagnosis.charts import feature_chart
+from diagnosis.cohort import cohort_index, percentile_label, preload as preload_cohorts
+from diagnosis.drift import DriftMonitor
+from diagnosis.explain import Explainers, top_contributions
+from diagnosis.models import ModelRegistry
+from diagnosis.predict import Predictor
+from diagnosis.profiling import Profiler
+from diagnosis.reports import Report, ReportRenderer, prediction_label, thyroid_report
+from diagnosis.schema import SCHEMAS
 
 # Page configuration
 st.set_page_config(
@@ -14,21 +20,70 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Optional per-stage render timing (DIAGNOSIS_PROFILE=1 or ?profile=1)
+profiler = Profiler(enabled=profiling.ENABLED or st.query_params.get("profile") == "1")
+
 # Initialize session state
 if 'selected' not in st.session_state:
     st.session_state.selected = "Home"
 
-# Load models
+# Load models lazily: each .sav file is unpickled the first time its page
+# needs it, and the rest are warmed on a background thread. The predictor and
+# its prediction caches are shared by all sessions, so repeated form
+# submissions (e.g. the default slider values) skip the model call. Inputs
+# also feed the drift monitor (diagnosis.drift).
+@st.cache_resource
+def load_predictor():
+    registry = rollout.configure(ModelRegistry())
+    registry.preload()
+    monitor = None
+    if drift.ENABLED:
+        # Every rerun runs on a new thread, so rows go to one long-lived observer
+        monitor = DriftMonitor(background=True)
+        if drift.EXPORT_PATH:
+            monitor.start_export(drift.EXPORT_PATH)
+    return Predictor(registry, drift_monitor=monitor)
+
+predictor = load_predictor()
+profiler.lap("load_predictor")
+
+# PDF reports render on a shared worker pool, only when a download is
+# requested, and are cached by result so repeat downloads are instant
+@st.cache_resource
+def load_report_renderer():
+    return ReportRenderer()
+
+report_renderer = load_report_renderer()
+
+# Every prediction is kept in the results database (written on a background
+# thread) so a patient's history can be looked up later
+@st.cache_resource
+def load_result_store():
+    return store.ResultStore() if store.ENABLED else None
+
+result_store = load_result_store()
+
+# Percentile-of-cohort indexes for the result summaries: one small quantile
+# grid per dataset, built once (or memory-mapped from .cache/) and shared by
+# all sessions
+@st.cache_resource
+def load_cohorts():
+    preload_cohorts()
+    return True
+
+load_cohorts()
+
+# Per-model explanation tables (coefficients and training-data baselines),
+# built on first use and shared by all sessions
 @st.cache_resource
-def load_models():
-    models = {}
+def load_explainers():
+    return Explainers()
+
+explainers = load_explainers()
+
+def get_model(name):
     try:
-        models['diabetes'] = pickle.load(open('Models/diabetes_model.sav', 'rb'))
-        models['heart_disease'] = pickle.load(open('Models/heart_disease_model.sav', 'rb'))
-        models['parkinsons'] = pickle.load(open('Models/parkinsons_model.sav', 'rb'))
-        models['lung_cancer'] = pickle.load(open('Models/lungs_disease_model.sav', 'rb'))
-        models['thyroid'] = pickle.load(open('Models/Thyroid_model.sav', 'rb'))
-        print("All models loaded successfully!")  # Debugging
+        return predictor.registry[name]
     except FileNotFoundError as e:
         st.error(f"Error: Model file not found. Please check the file paths. Details: {e}")
         st.stop()  # Stop execution if models can't be loaded
@@ -36,39 +91,49 @@ def load_models():
         st.error(f"Error loading models: {e}")
         st.stop()
 
-    return models
-
-models = load_models()
-
-# Function to create a radar chart
-def display_radar_chart(features):
-    categories = ['Fundamental Frequency', 'Jitter', 'Shimmer', 'NHR', 'HNR', 'DFA']
-    values = features[:6]  # Assuming the first 6 features correspond to the radar chart categories
-
-    # Create radar chart
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(
-        r=values,
-        theta=categories,
-        fill='toself',
-        name='Voice Features',
-        line_color='#005EB8',
-        fillcolor='rgba(0, 94, 184, 0.3)'
-    ))
-
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 1]
-            )
-        ),
-        showlegend=False,
-        margin=dict(l=20, r=20, t=20, b=20),
-        height=300
-    )
-
-    return fig
+def predict(name, rows):
+    get_model(name)
+    with profiler.stage(f"predict:{name}"):
+        start = time.perf_counter()
+        predictions, scores = predictor.score(name, rows)
+        latency = time.perf_counter() - start
+    if result_store is not None:
+        for row, prediction, value in zip(rows, predictions, scores):
+            result_store.record(name, row, prediction, value, st.session_state.get("patient_id"),
+                                predictor.registry.version_label(name), latency, "app")
+    return predictions
+
+# Summary lines, each continuous input with its percentile in the training
+# cohort. columns: the schema column behind each summary entry, in order
+# (defaults to the schema order).
+def display_summary(disease, summary, row, columns=None):
+    index = cohort_index(disease)
+    positions = [SCHEMAS[disease].index[name] for name in columns or SCHEMAS[disease].names]
+    with profiler.stage(f"cohort:{disease}"):
+        percentiles = index.percentiles(row)
+    for (label, value), j in zip(summary.items(), positions):
+        if index.continuous[j] and percentiles[j] == percentiles[j]:
+            st.write(f"- {label}: {value} ({percentile_label(percentiles[j])})")
+        else:
+            st.write(f"- {label}: {value}")
+
+# The inputs that moved this prediction most, towards or away from detection
+def display_explanation(disease, row):
+    with profiler.stage(f"explain:{disease}"):
+        explainer = explainers.get(disease, get_model(disease))
+        top = top_contributions(disease, explainer.contributions(row)[0])
+    st.markdown("#### Top Contributing Factors:")
+    for _, label, contribution in top:
+        direction = "raises" if contribution > 0 else "lowers"
+        st.write(f"- {label}: {direction} risk ({contribution:+.2f})")
+    if not explainer.exact:
+        st.caption("Approximate attributions (sampled Shapley values).")
+
+# Radar chart of a feature row against the typical patient without the
+# condition; figures come from a per-disease template built once per process
+def display_feature_chart(disease, row):
+    with profiler.stage(f"chart:{disease}"):
+        st.plotly_chart(feature_chart(disease, row), use_container_width=True)
 
 # Custom CSS for modern interface
 st.markdown("""
@@ -322,6 +387,7 @@ st.markdown("""
     }
 </style>
 """, unsafe_allow_html=True)
+profiler.lap("css")
 
 # Navigation at the top
 def display_nav():
@@ -334,7 +400,7 @@ def display_nav():
 
     # Middle - Navigation buttons
     with col2:
-        nav_cols = st.columns(3)
+        nav_cols = st.columns(4)
         with nav_cols[0]:
             home_class = "active" if 'selected' not in st.session_state or st.session_state.selected == "Home" else ""
             if st.button("🏠 Home", key="home_nav", help="Go to home page"):
@@ -351,9 +417,14 @@ def display_nav():
             if st.button("📞 Contact", key="contact_nav", help="Contact support"):
                 st.session_state.selected = "Contact"
 
+        with nav_cols[3]:
+            if st.button("📁 History", key="history_nav", help="Look up a patient's past results"):
+                st.session_state.selected = "History"
+
     # Right side - Optional space for user profile or settings
     with col3:
         st.markdown('<div style="text-align: right;"><span style="color: #666;">v2.0</span></div>', unsafe_allow_html=True)
+        st.text_input("Patient ID (optional)", key="patient_id", help="Results are saved under this ID for the History page")
 
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -485,19 +556,16 @@ def display_heart_disease():
         st.markdown("### Patient Information")
         age = st.slider('Age', 18, 100, 50)
         sex = st.radio('Sex (1 = Male; 0 = Female)', ['Female', 'Male'])
-        sex_val = 1 if sex == 'Male' else 0
 
         cp = st.selectbox('Chest Pain Type', [0, 1, 2, 3], format_func=lambda x: {0: "Typical Angina", 1: "Atypical Angina", 2: "Non-anginal Pain", 3: "Non-anginal Pain", 3: "Asymptomatic"}[x]) #Duplication of value 3 corrected
         trestbps = st.slider('Resting Blood Pressure (mm Hg)', 80, 200, 120)
         chol = st.slider('Serum Cholesterol (mg/dl)', 100, 600, 200)
         fbs = st.radio('Fasting Blood Sugar > 120 mg/dl', ['No', 'Yes'])
-        fbs_val = 1 if fbs == 'Yes' else 0
 
         restecg = st.selectbox('Resting Electrocardiographic Results', [0, 1, 2], format_func=lambda x: {0: "Normal", 1: "Having ST-T wave abnormality", 2: "Showing probable or definite left ventricular hypertrophy"}[x])
 
         thalach = st.slider('Maximum Heart Rate', 60, 220, 150)
         exang = st.radio('Exercise Induced Angina', ['No', 'Yes'])
-        exang_val = 1 if exang == 'Yes' else 0
         oldpeak = st.slider('ST Depression', 0.0, 6.0, 1.0, 0.1)
         slope = st.selectbox('Slope of Peak Exercise ST', [0, 1, 2], format_func=lambda x: {0: "Upsloping", 1: "Flat", 2: "Downsloping"}[x])
         ca = st.slider('Number of Major Vessels', 0, 3, 0)
@@ -505,25 +573,26 @@ def display_heart_disease():
 
         submit_button = st.form_submit_button(label="Run Heart Disease Prediction")
 
+    profiler.lap("heart_disease:form")
     if submit_button:
         with st.spinner('Analyzing cardiovascular parameters...'):
             try:
-                heart_prediction = models['heart_disease'].predict([[age, sex_val, cp, trestbps, chol, fbs_val, restecg, thalach, exang_val, oldpeak, slope, ca, thal]])
+                heart_row = features.heart_disease_features(age, sex, cp, trestbps, chol, fbs, restecg, thalach, exang, oldpeak, slope, ca, thal)
+                heart_prediction = predict('heart_disease', [heart_row])
                 st.success("### Prediction Complete!")
                 st.markdown("#### Summary of Input Data:")
-                st.write(f"- Age: {age}")
-                st.write(f"- Sex: {sex}")
-                st.write(f"- Chest Pain Type: {cp}")
-                st.write(f"- Resting Blood Pressure: {trestbps} mm Hg")
-                st.write(f"- Serum Cholesterol: {chol} mg/dl")
-                st.write(f"- Fasting Blood Sugar: {fbs}")
-                st.write(f"- Resting Electrocardiographic Results: {restecg}")
-                st.write(f"- Maximum Heart Rate: {thalach}")
-                st.write(f"- Exercise Induced Angina: {'Yes' if exang_val == 1 else 'No'}")
-                st.write(f"- ST Depression: {oldpeak}")
-                st.write(f"- Slope of Peak Exercise ST: {slope}")
-                st.write(f"- Number of Major Vessels: {ca}")
-                st.write(f"- Thalassemia: {thal}")            
+                summary = {
+                    "Age": age, "Sex": sex, "Chest Pain Type": cp,
+                    "Resting Blood Pressure": f"{trestbps} mm Hg", "Serum Cholesterol": f"{chol} mg/dl",
+                    "Fasting Blood Sugar": fbs, "Resting Electrocardiographic Results": restecg,
+                    "Maximum Heart Rate": thalach, "Exercise Induced Angina": exang,
+                    "ST Depression": oldpeak, "Slope of Peak Exercise ST": slope,
+                    "Number of Major Vessels": ca, "Thalassemia": thal,
+                }
+                display_summary('heart_disease', summary, heart_row)
+                profiler.lap("heart_disease:summary")
+                display_feature_chart('heart_disease', heart_row)
+                display_explanation('heart_disease', heart_row)
 
                 # Result display with recommendations
                 if heart_prediction[0] == 1:
@@ -549,6 +618,8 @@ def display_heart_disease():
                     - Limit alcohol consumption
                     - Manage stress
                     """)
+
+                display_save_options(Report('heart_disease', summary, {"Prediction": prediction_label('heart_disease', heart_prediction[0])}))
             except Exception as e:
                 st.error(f"Prediction Error: {e}")
 
@@ -557,68 +628,32 @@ def display_parkinsons():
 
      with st.form(key='parkinsons_form'):
         st.markdown("### Voice Feature Measurements")
-        meanfreq = st.slider('Average Vocal Fundamental Frequency (Hz)', 80.0, 260.0, 150.0)
-        sd = st.slider('Frequency Variation (SD)', 0.000, 0.100, 0.05, 0.001)
-        median = st.slider('Median Fundamental Frequency', 80.0, 260.0, 150.0)
-        Q25 = st.slider('First Quartile', 80.0, 260.0, 150.0)
-        Q75 = st.slider('Third Quartile', 80.0, 260.0, 150.0)
-        IQR = st.slider('Interquartile Range', 0.0, 0.2, 0.1, 0.001)
-        skew = st.slider('Skewness', -5.0, 5.0, 0.0, 0.01)
-        kurt = st.slider('Kurtosis', 1.0, 50.0, 5.0, 0.1)
-        sp_ent = st.slider('Spectral Entropy', 0.0, 1.0, 0.5, 0.01)
-        sfm = st.slider('Spectral Flatness', 0.0, 1.0, 0.5, 0.01)
-        mode = st.slider('Mode Frequency', 80.0, 260.0, 150.0)
-        centroid = st.slider('Frequency Centroid', 80.0, 260.0, 150.0)
-        peakf = st.slider('Peak Frequency', 80.0, 260.0, 150.0)
-        meanfun = st.slider('Average Fundamental Frequency Across Acoustic Signals', 0.0, 0.5, 0.25, 0.001)
-        minfun = st.slider('Minimum Fundamental Frequency Across Acoustic Signals', 0.0, 0.2, 0.1, 0.001)
-        maxfun = st.slider('Maximum Fundamental Frequency Across Acoustic Signals', 0.1, 0.5, 0.3, 0.001)
-        meandom = st.slider('Average of Dominant Frequency Measured Across Acoustic Signals', 0.0, 2.0, 1.0, 0.01)
-        mindom = st.slider('Minimum of Dominant Frequency Measured Across Acoustic Signals', 0.0, 0.5, 0.2, 0.001)
-        maxdom = st.slider('Maximum of Dominant Frequency Measured Across Acoustic Signals', 2.0, 10.0, 5.0, 0.01)
-        dfrange = st.slider('Range of Dominant Frequency Measured Across Acoustic Signals', 2.0, 10.0, 5.0, 0.01)
-        modindx = st.slider('Modulation Index', 0.0, 0.2, 0.1, 0.001)
-        ppe = st.slider('Pitch Period Entropy', 0.0, 1.0, 0.5, 0.01)
+        voice = {}
+        for column in SCHEMAS['parkinsons'].columns:
+            voice[column.name] = st.slider(column.label, column.low, column.high, column.default, column.step, format=column.format)
         submit_button = st.form_submit_button(label="Run Parkinson's Prediction")
 
+     profiler.lap("parkinsons:form")
      if submit_button:
         with st.spinner('Analyzing voice features...'):
             try:
-                parkinsons_prediction = models['parkinsons'].predict([[meanfreq, sd, median, Q25, Q75, IQR, skew, kurt, sp_ent, sfm, mode, centroid, peakf, meanfun, minfun, maxfun, meandom, mindom, maxdom, dfrange, modindx, ppe]])
+                parkinsons_row = features.parkinsons_features(voice)
+                parkinsons_prediction = predict('parkinsons', [parkinsons_row])
                 st.success("### Prediction Complete!")
                 st.markdown("#### Summary of Input Data:")
-                st.write(f"- Average Vocal Fundamental Frequency (Hz): {meanfreq}")
-                st.write(f"- Frequency Variation (SD): {sd}")
-                st.write(f"- Median Fundamental Frequency (Hz): {median}")
-                st.write(f"- First Quartile: {Q25}")
-                st.write(f"- Third Quartile: {Q75}")
-                st.write(f"- Interquartile Range: {IQR}")
-                st.write(f"- Skewness: {skew}")
-                st.write(f"- Kurtosis: {kurt}")
-                st.write(f"- Spectral Entropy: {sp_ent}")
-                st.write(f"- Spectral Flatness: {sfm}")
-                st.write(f"- Mode Frequency: {mode}")
-                st.write(f"- Frequency Centroid: {centroid}")
-                st.write(f"- Peak Frequency: {peakf}")
-                st.write(f"- Average of Fundamental Frequency Across Acoustic Signals: {meanfun}")
-                st.write(f"- Minimum Fundamental Frequency Across Acoustic Signals: {minfun}")
-                st.write(f"- Maximum Fundamental Frequency Across Acoustic Signals: {maxfun}")
-                st.write(f"- Average of Dominant Frequency Measured Across Acoustic Signals: {meandom}")
-                st.write(f"- Minimum of Dominant Frequency Measured Across Acoustic Signals: {mindom}")
-                st.write(f"- Maximum of Dominant Frequency Measured Across Acoustic Signals: {maxdom}")
-                st.write(f"- Range of Dominant Frequency Measured Across Acoustic Signals: {dfrange}")
-                st.write(f"- Modulation Index: {modindx}")
-                st.write(f"- Pitch Period Entropy: {ppe}")
+                summary = {column.label: voice[column.name] for column in SCHEMAS['parkinsons'].columns}
+                display_summary('parkinsons', summary, parkinsons_row)
+                profiler.lap("parkinsons:summary")
 
                  # Display radar chart
-                radar_chart = display_radar_chart([meanfreq, sd, median, Q25, Q75, IQR, skew, kurt, sp_ent, sfm, mode, centroid, peakf, meanfun, minfun, maxfun, meandom, mindom, maxdom, dfrange, modindx, ppe])
-                st.plotly_chart(radar_chart, use_container_width=True)
+                display_feature_chart('parkinsons', parkinsons_row)
+                display_explanation('parkinsons', parkinsons_row)
 
                 # Add explanation for the radar chart
                 st.markdown("""
                 <p style="color: #555;">
-                This radar chart visualizes the key voice characteristics measured in this analysis.
-                Larger areas may indicate greater deviation from typical voice patterns seen in healthy individuals.
+                This radar chart visualizes the key voice characteristics measured in this analysis, each scaled to the range seen in the training data.
+                The grey outline shows the typical voice pattern of healthy individuals; larger deviations from it may be significant.
                 </p>
                 """, unsafe_allow_html=True)
 
@@ -641,6 +676,8 @@ def display_parkinsons():
 
                     **Recommendation:** Maintain regular health check-ups and monitor for any changes in movement or speech.
                     """)
+
+                display_save_options(Report('parkinsons', summary, {"Prediction": prediction_label('parkinsons', parkinsons_prediction[0])}))
             except Exception as e:
                 st.error(f"Prediction Error: {e}")
 
@@ -668,27 +705,26 @@ def display_lung_cancer():
 
         submit_button = st.form_submit_button(label="Predict Lung Cancer Risk")
 
+    profiler.lap("lung_cancer:form")
     if submit_button:
         with st.spinner('Analyzing risk factors...'):
             try:
-                lung_prediction = models['lung_cancer'].predict([[GENDER, AGE, SMOKING, YELLOW_FINGERS, ANXIETY, PEER_PRESSURE, CHRONIC_DISEASE, FATIGUE, ALLERGY, WHEEZING, ALCOHOL_CONSUMING, COUGHING, SHORTNESS_OF_BREATH, SWALLOWING_DIFFICULTY, CHEST_PAIN]])
+                lung_row = features.lung_cancer_features(GENDER, AGE, SMOKING, YELLOW_FINGERS, ANXIETY, PEER_PRESSURE, CHRONIC_DISEASE, FATIGUE, ALLERGY, WHEEZING, ALCOHOL_CONSUMING, COUGHING, SHORTNESS_OF_BREATH, SWALLOWING_DIFFICULTY, CHEST_PAIN)
+                lung_prediction = predict('lung_cancer', [lung_row])
                 st.success("### Prediction Complete!")
                 st.markdown("#### Summary of Input Data:")
-                st.write(f"- Gender: {GENDER}")
-                st.write(f"- Age: {AGE}")
-                st.write(f"- Smoking: {SMOKING}")
-                st.write(f"- Yellow Fingers: {YELLOW_FINGERS}")
-                st.write(f"- Anxiety: {ANXIETY}")
-                st.write(f"- Peer Pressure: {PEER_PRESSURE}")
-                st.write(f"- Chronic Disease: {CHRONIC_DISEASE}")
-                st.write(f"- Fatigue: {FATIGUE}")
-                st.write(f"- Allergy: {ALLERGY}")
-                st.write(f"- Wheezing: {WHEEZING}")
-                st.write(f"- Alcohol Consuming: {ALCOHOL_CONSUMING}")
-                st.write(f"- Coughing: {COUGHING}")
-                st.write(f"- Shortness Of Breath: {SHORTNESS_OF_BREATH}")
-                st.write(f"- Swallowing Difficulty: {SWALLOWING_DIFFICULTY}")
-                st.write(f"- Chest Pain: {CHEST_PAIN}")
+                summary = {
+                    "Gender": GENDER, "Age": AGE, "Smoking": SMOKING, "Yellow Fingers": YELLOW_FINGERS,
+                    "Anxiety": ANXIETY, "Peer Pressure": PEER_PRESSURE, "Chronic Disease": CHRONIC_DISEASE,
+                    "Fatigue": FATIGUE, "Allergy": ALLERGY, "Wheezing": WHEEZING,
+                    "Alcohol Consuming": ALCOHOL_CONSUMING, "Coughing": COUGHING,
+                    "Shortness Of Breath": SHORTNESS_OF_BREATH, "Swallowing Difficulty": SWALLOWING_DIFFICULTY,
+                    "Chest Pain": CHEST_PAIN,
+                }
+                display_summary('lung_cancer', summary, lung_row)
+                profiler.lap("lung_cancer:summary")
+                display_feature_chart('lung_cancer', lung_row)
+                display_explanation('lung_cancer', lung_row)
 
                 # Result display with recommendations
                 if lung_prediction[0] == 1:
@@ -708,71 +744,93 @@ def display_lung_cancer():
 
                     **Recommendation:** Continue regular health check-ups and maintain a healthy lifestyle.
                     """)
+
+                display_save_options(Report('lung_cancer', summary, {"Prediction": prediction_label('lung_cancer', lung_prediction[0])}))
             except Exception as e:
                 st.error(f"Prediction Error: {e}")
 
+# Result banner and recommendations for each overall thyroid risk level
+THYROID_RISK_BANNERS = {
+    'High': '<div class="result-box positive-result">High Risk: Strong indicators of thyroid dysfunction</div>',
+    'Moderate': '<div class="result-box positive-result" style="background-color: #fff3cd; color: #856404; border: 1px solid #ffeeba;">Moderate Risk: Some indicators of possible thyroid dysfunction</div>',
+    'Low': '<div class="result-box negative-result">Low Risk: Indicators suggest normal thyroid function</div>',
+}
+
+THYROID_RECOMMENDATIONS = {
+    'High': """
+        Based on the analysis, there is a **high risk** of thyroid dysfunction. We strongly recommend:
+
+        1. **Urgent consultation with an endocrinologist** for comprehensive evaluation
+        2. **Additional testing** including:
+           - Thyroid antibody tests (TPO, TgAb)
+           - Thyroid ultrasound
+           - Complete metabolic panel
+        3. **Close monitoring** of symptoms and thyroid function
+        4. **Medication evaluation** if currently on thyroid medication
+        """,
+    'Moderate': """
+        Based on the analysis, there is a **moderate risk** of thyroid dysfunction. We recommend:
+
+        1. **Follow-up with a primary care physician** within the next 1-2 weeks
+        2. **Additional thyroid function testing** to confirm results
+        3. **Monitoring of symptoms** and reporting any changes to your healthcare provider
+        4. **Review of current medications** that may affect thyroid function
+        """,
+    'Low': """
+        Based on the analysis, there is a **low risk** of thyroid dysfunction. We recommend:
+
+        1. **Routine health maintenance** with your primary care provider
+        2. **Regular thyroid screening** as part of annual check-ups, especially if you have family history
+        3. **Healthy lifestyle choices** including balanced nutrition and regular exercise
+        4. **Monitoring for new symptoms** that could indicate thyroid dysfunction
+        """,
+}
+
+# (lab, heading, column) of each lab in the lab value analysis
+LAB_ANALYSIS_LAYOUT = [('TSH', 'TSH Level', 0), ('T3', 'T3 Level', 0), ('TT4', 'Total T4 Level', 1)]
+
 def display_thyroid():
     st.title("Thyroid Disease Risk Assessment")
 
     with st.form(key='thyroid_form'):
         st.markdown("### Patient Demographics")
         gender = st.radio("Gender", ["Male", "Female"])
-        gender_val = 1 if gender == "Male" else 0
         age = st.slider("Age", min_value=1, max_value=120, value=40)
 
         st.markdown("### Medical Information")
         on_thyroxine = st.radio("Is the patient on thyroxine?", ["Yes", "No"])
-        on_thyroxine_val = 1 if on_thyroxine == "Yes" else 0
         tsh = st.slider("TSH Level (mU/L)", min_value=0.0, max_value=100.0, value=2.5, step=0.1)
         t3_measured = st.radio("Has T3 been measured?", ["Yes", "No"]) #No longer use, just input if measured or not
-        t3_measured_val = 1 if t3_measured == "Yes" else 0
-        t3 = st.slider("T3 Level (ng/dL)", min_value=0.0, max_value=10.0, value=1.2, step=0.1)
+        t3 = st.slider("T3 Level (ng/mL)", min_value=0.0, max_value=10.0, value=1.2, step=0.1)
         tt4 = st.slider("TT4 Level (μg/dL)", min_value=0.0, max_value=30.0, value=8.0, step=0.1)
         #free_t4 = st.slider("Free T4 Level (ng/dL)", min_value=0.0, max_value=5.0, value=1.0, step=0.1) #Free t4 is not used, remove
         submit_button = st.form_submit_button(label="Predict Thyroid Disease Risk")
+    profiler.lap("thyroid:form")
     if submit_button:
         with st.spinner('Analyzing thyroid function...'):
             try:
-                thyroid_input = [[age, gender_val, on_thyroxine_val, t3_measured_val, t3, tt4, tsh]]
-                thyroid_prediction = models['thyroid'].predict(thyroid_input)
-
-                # Calculate lab value risk score
-                lab_risk = 0
-                if tsh < 0.4 or tsh > 4.0:
-                    lab_risk += 1
-                if t3 < 0.8 or t3 > 2.0:
-                    lab_risk += 1
-                if tt4 < 5.0 or tt4 > 12.0:
-                    lab_risk += 1
-                #if free_t4 < 0.8 or free_t4 > 1.8:
-                #    lab_risk += 1
-
-                # Calculate overall risk based on model prediction, lab values, and symptoms
-                overall_risk = "Low"
+                thyroid_input = [features.thyroid_features(age, gender, on_thyroxine, tsh, t3_measured, t3, tt4)]
+                thyroid_prediction = predict('thyroid', thyroid_input)
+
+                # Calculate lab value risk score and overall risk based on model prediction, lab values, and symptoms
+                lab_risk = risk.lab_risk(tsh, t3, tt4)
                 symptom_score = 0  # Placeholder for symptom score; you can implement this based on user input
-                if thyroid_prediction[0] == 0: #Positive
-                    if lab_risk >= 2 or symptom_score >= 5:
-                        overall_risk = "High"
-                    else:
-                        overall_risk = "Moderate"
-                else: #Negative
-                    if lab_risk >= 3 and symptom_score >= 6:
-                        overall_risk = "Moderate"
-
-                # Result display with appropriate styling
-                if overall_risk == "High":
-                    st.markdown('<div class="result-box positive-result">High Risk: Strong indicators of thyroid dysfunction</div>', unsafe_allow_html=True)
-                    display_lab_analysis(tsh,t3,tt4)
-                    display_recommendations(overall_risk)
-
-                elif overall_risk == "Moderate":
-                    st.markdown('<div class="result-box positive-result" style="background-color: #fff3cd; color: #856404; border: 1px solid #ffeeba;">Moderate Risk: Some indicators of possible thyroid dysfunction</div>', unsafe_allow_html=True)
-                    display_lab_analysis(tsh,t3,tt4)
-                    display_recommendations(overall_risk)
-                else:
-                    st.markdown('<div class="result-box negative-result">Low Risk: Indicators suggest normal thyroid function</div>', unsafe_allow_html=True)
-                    display_lab_analysis(tsh,t3,tt4)
-                    display_recommendations(overall_risk)
+                overall_risk = risk.overall_risk(thyroid_prediction[0], lab_risk, symptom_score)
+
+                st.markdown(THYROID_RISK_BANNERS[overall_risk], unsafe_allow_html=True)
+                display_lab_analysis(tsh,t3,tt4)
+                display_recommendations(overall_risk)
+
+                st.markdown("#### Compared with the Training Cohort:")
+                display_summary('thyroid', {"Age": age, "TSH": f"{tsh} mU/L", "T3": f"{t3} ng/mL", "TT4": f"{tt4} μg/dL"},
+                                thyroid_input[0], ['age', 'TSH', 'T3', 'TT4'])
+                display_feature_chart('thyroid', thyroid_input[0])
+                display_explanation('thyroid', thyroid_input[0])
+                profiler.lap("thyroid:result")
+
+                # Add export/save options
+                display_save_options(thyroid_report(age, gender, on_thyroxine, tsh, t3, tt4, overall_risk))
+                profiler.lap("thyroid:save_options")
 
             except Exception as e:
                 st.error(f"Prediction Error: {e}")
@@ -780,9 +838,6 @@ def display_thyroid():
         # Add educational information
         display_educational_information()
 
-        # Add export/save options
-        display_save_options(age, gender, on_thyroxine, tsh, t3, tt4, overall_risk)
-
         # Reference information
         display_reference_information()
 
@@ -792,68 +847,18 @@ def display_lab_analysis(tsh, t3, tt4):
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.markdown("### Lab Value Analysis")
 
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown("#### TSH Level")
-        if tsh < 0.4:
-            st.markdown("**Low TSH:** May indicate hyperthyroidism")
-        elif tsh > 4.0:
-            st.markdown("**High TSH:** May indicate hypothyroidism")
-        else:
-            st.markdown("**Normal TSH:** Within reference range")
-
-        st.markdown("#### T3 Level")
-        if t3 < 0.8:
-            st.markdown("**Low T3:** May indicate hypothyroidism")
-        elif t3 > 2.0:
-            st.markdown("**High T3:** May indicate hyperthyroidism")
-        else:
-            st.markdown("**Normal T3:** Within reference range")
-
-    with col2:
-        st.markdown("#### Total T4 Level")
-        if tt4 < 5.0:
-            st.markdown("**Low TT4:** May indicate hypothyroidism")
-        elif tt4 > 12.0:
-            st.markdown("**High TT4:** May indicate hyperthyroidism")
-        else:
-            st.markdown("**Normal TT4:** Within reference range")
+    statuses = risk.lab_statuses(tsh, t3, tt4)
+    columns = st.columns(2)
+    for lab, heading, column in LAB_ANALYSIS_LAYOUT:
+        with columns[column]:
+            st.markdown(f"#### {heading}")
+            st.markdown(f"**{statuses[lab]} {lab}:** {risk.lab_interpretation(lab, statuses[lab])}")
     st.markdown("</div>", unsafe_allow_html=True)
 
 def display_recommendations(overall_risk):
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.markdown("### Recommendations")
-
-    if overall_risk == "High":
-        st.markdown("""
-        Based on the analysis, there is a **high risk** of thyroid dysfunction. We strongly recommend:
-
-        1. **Urgent consultation with an endocrinologist** for comprehensive evaluation
-        2. **Additional testing** including:
-           - Thyroid antibody tests (TPO, TgAb)
-           - Thyroid ultrasound
-           - Complete metabolic panel
-        3. **Close monitoring** of symptoms and thyroid function
-        4. **Medication evaluation** if currently on thyroid medication
-        """)
-    elif overall_risk == "Moderate":
-        st.markdown("""
-        Based on the analysis, there is a **moderate risk** of thyroid dysfunction. We recommend:
-
-        1. **Follow-up with a primary care physician** within the next 1-2 weeks
-        2. **Additional thyroid function testing** to confirm results
-        3. **Monitoring of symptoms** and reporting any changes to your healthcare provider
-        4. **Review of current medications** that may affect thyroid function
-        """)
-    else:
-        st.markdown("""
-        Based on the analysis, there is a **low risk** of thyroid dysfunction. We recommend:
-
-        1. **Routine health maintenance** with your primary care provider
-        2. **Regular thyroid screening** as part of annual check-ups, especially if you have family history
-        3. **Healthy lifestyle choices** including balanced nutrition and regular exercise
-        4. **Monitoring for new symptoms** that could indicate thyroid dysfunction
-        """)
+    st.markdown(THYROID_RECOMMENDATIONS[overall_risk])
     st.markdown("</div>", unsafe_allow_html=True)
 
 def display_educational_information():
@@ -915,56 +920,23 @@ def display_educational_information():
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-def display_save_options(age, gender, on_thyroxine, tsh, t3, tt4, overall_risk):
+def display_save_options(report):
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.markdown("### Save Results")
 
     col1, col2 = st.columns(2)
     with col1:
-        if st.download_button(label="📊 Export as PDF", data=create_pdf_report(age, gender, on_thyroxine, tsh, t3, tt4, overall_risk), file_name="thyroid_assessment_report.pdf", mime="application/pdf"):
-            st.success("PDF report downloaded successfully!")
+        # Passing a callable defers the PDF to the click; rendering runs on the report pool
+        st.download_button(label="📊 Export as PDF", data=lambda: report_renderer.render(report), file_name=report.filename(), mime="application/pdf", key=f"pdf_{report.disease}", on_click="ignore")
 
     with col2:
-        report_summary = get_report_summary(age, gender, on_thyroxine, tsh, t3, tt4, overall_risk)
-        if st.button("📋 Copy Summary to Clipboard"):
-            st.session_state.clipboard_content = report_summary
+        if st.button("📋 Copy Summary to Clipboard", key=f"copy_{report.disease}"):
+            st.session_state.clipboard_content = report.text()
             st.success("Summary copied to clipboard!")
 
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-def get_report_summary(age, gender, on_thyroxine, tsh, t3, tt4, overall_risk):
-    return f"""
-        Thyroid Assessment Report
-
-        Patient Information:
-        Age: {age}
-        Gender: {gender}
-        On Thyroxine: {on_thyroxine}
-
-        Lab Values:
-        TSH: {tsh}
-        T3: {t3}
-        TT4: {tt4}
-
-        Overall Risk: {overall_risk}
-        """
-
-def create_pdf_report(age, gender, on_thyroxine, tsh, t3, tt4, overall_risk):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    c.drawString(100, 750, "Thyroid Assessment Report")
-    c.drawString(100, 730, f"Age: {age}")
-    c.drawString(100, 710, f"Gender: {gender}")
-    c.drawString(100, 690, f"On Thyroxine: {on_thyroxine}")
-    c.drawString(100, 670, f"TSH: {tsh}")
-    c.drawString(100, 650, f"T3: {t3}")
-    c.drawString(100, 630, f"TT4: {tt4}")
-    c.drawString(100, 610, f"Overall Risk: {overall_risk}")
-    c.save()
-    buffer.seek(0)
-    return buffer.read()
-
 def display_reference_information():
     st.markdown('<div class="card" style="font-size: 12px; color: gray;">', unsafe_allow_html=True)
     st.markdown("""
@@ -977,6 +949,10 @@ def display_reference_information():
     """)
     st.markdown("</div>", unsafe_allow_html=True)
 
+# Schema columns behind the diabetes summary, which is not in schema order
+DIABETES_SUMMARY_COLUMNS = ['Pregnancies', 'Age', 'Glucose', 'BloodPressure', 'Insulin',
+                            'SkinThickness', 'BMI', 'DiabetesPedigreeFunction']
+
 def display_diabetes():
     st.title("Diabetes Prediction")
 
@@ -999,20 +975,24 @@ def display_diabetes():
 
         submit_button = st.form_submit_button(label="Run Diabetes Prediction")
 
+    profiler.lap("diabetes:form")
     if submit_button:
         with st.spinner('Analyzing patient data...'):
             try:
-                diab_prediction = models['diabetes'].predict([[Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age]])
+                diabetes_row = features.diabetes_features(Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age)
+                diab_prediction = predict('diabetes', [diabetes_row])
                 st.success("### Prediction Complete!")
                 st.markdown("#### Summary of Input Data:")
-                st.write(f"- Pregnancies: {Pregnancies}")
-                st.write(f"- Age: {Age}")
-                st.write(f"- Glucose Level: {Glucose} mg/dL")
-                st.write(f"- Blood Pressure: {BloodPressure} mm Hg")
-                st.write(f"- Insulin Level: {Insulin} mu U/ml")
-                st.write(f"- Skin Thickness: {SkinThickness} mm")
-                st.write(f"- BMI: {BMI}")
-                st.write(f"- Diabetes Pedigree Function: {DiabetesPedigreeFunction}")
+                summary = {
+                    "Pregnancies": Pregnancies, "Age": Age, "Glucose Level": f"{Glucose} mg/dL",
+                    "Blood Pressure": f"{BloodPressure} mm Hg", "Insulin Level": f"{Insulin} mu U/ml",
+                    "Skin Thickness": f"{SkinThickness} mm", "BMI": BMI,
+                    "Diabetes Pedigree Function": DiabetesPedigreeFunction,
+                }
+                display_summary('diabetes', summary, diabetes_row, DIABETES_SUMMARY_COLUMNS)
+                profiler.lap("diabetes:summary")
+                display_feature_chart('diabetes', diabetes_row)
+                display_explanation('diabetes', diabetes_row)
 
                 # Result display with recommendations
                 if diab_prediction[0] == 1:
@@ -1032,6 +1012,8 @@ def display_diabetes():
 
                     **Recommendation:** Maintain healthy lifestyle habits and continue regular check-ups.
                     """)
+
+                display_save_options(Report('diabetes', summary, {"Prediction": prediction_label('diabetes', diab_prediction[0])}))
             except Exception as e:
                 st.error(f"Prediction Error: {e}")
 def display_about():
@@ -1064,6 +1046,37 @@ def display_about():
     </div>
     """, unsafe_allow_html=True)
 
+def display_history():
+    st.title("Patient History")
+    if result_store is None:
+        st.info("Result storage is turned off (DIAGNOSIS_STORE=0).")
+        return
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        patient_id = st.text_input("Patient ID", value=st.session_state.get("patient_id", ""), key="history_patient_id")
+    with col2:
+        disease = st.selectbox("Model", ["All"] + list(SCHEMAS), format_func=lambda d: d if d == "All" else d.replace("_", " ").title())
+    if not patient_id:
+        st.write("Enter a patient ID to see their saved results.")
+        return
+
+    with profiler.stage("history:query"):
+        results = result_store.history(patient_id, None if disease == "All" else disease)
+    if not results:
+        st.write(f"No saved results for patient {patient_id}.")
+        return
+    st.write(f"{len(results)} result(s), newest first:")
+    st.dataframe([{
+        "Time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["created_at"])),
+        "Model": r["disease"],
+        "Result": prediction_label(r["disease"], r["prediction"]),
+        "Score": round(r["score"], 4),
+        "Model Version": r["model_version"],
+        "Latency (ms)": round(r["latency_ms"], 2) if r["latency_ms"] is not None else None,
+        "Inputs": ", ".join(f"{k}={v:g}" for k, v in r["inputs"].items()),
+    } for r in results], use_container_width=True, hide_index=True)
+
 def display_contact():
     st.title("Contact Us")
     st.markdown("""
@@ -1090,27 +1103,33 @@ def display_contact():
 
 
 # Main App Logic
-display_nav()
-
-if st.session_state.selected == "Home":
-    display_home()
-elif st.session_state.selected == "Heart Disease":
-    display_heart_disease()
-elif st.session_state.selected == "Parkinson's":
-    display_parkinsons()
-elif st.session_state.selected == "Lung Cancer":
-    display_lung_cancer()
-elif st.session_state.selected == "Thyroid":
-    display_thyroid()
-elif st.session_state.selected == "Diabetes":
-    display_diabetes()
-elif st.session_state.selected == "About":
-    display_about()
-elif st.session_state.selected == "Contact":
-    display_contact()
+with profiler.stage("nav"):
+    display_nav()
+
+pages = {
+    "Home": display_home,
+    "Heart Disease": display_heart_disease,
+    "Parkinson's": display_parkinsons,
+    "Lung Cancer": display_lung_cancer,
+    "Thyroid": display_thyroid,
+    "Diabetes": display_diabetes,
+    "About": display_about,
+    "Contact": display_contact,
+    "History": display_history,
+}
+if st.session_state.selected in pages:
+    with profiler.stage(f"page:{st.session_state.selected}"):
+        pages[st.session_state.selected]()
 
 # Add version and credits at the bottom
 st.markdown("---")
 st.markdown("<p style='text-align: center; color: gray; font-size: 15px;'>Medical Diagnosis AI v1.0 | For educational purposes only</p>", unsafe_allow_html=True)
+profiler.lap("footer")
+
+# Render timing breakdown, shown only when profiling is enabled
+if profiler.enabled:
+    profiler.finish(page=st.session_state.selected)
+    with st.expander(f"⏱️ Render profile: {profiler.total() * 1000:.1f} ms"):
+        st.table(profiler.breakdown())
 
 
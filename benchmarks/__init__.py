@@ -0,0 +1 @@
+# Benchmarks for the diagnosis inference paths; run with python -m benchmarks.<name>
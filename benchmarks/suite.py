@@ -0,0 +1,236 @@
+# End-to-end benchmark suite: cold start, per-model single-row latency
+# percentiles, batch throughput on rows sampled from Datasets/, peak RSS, and
+# Streamlit rerun time for every page (via AppTest). Results are flat records
+# (benchmark, name, metric, value, unit) so two runs can be compared; with
+# --baseline the run fails when any metric regresses past --tolerance.
+#
+#     python -m benchmarks.suite --json bench.json
+#     python -m benchmarks.suite --baseline bench.json --tolerance 0.25
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from benchmarks.svc import time_call
+from diagnosis.batch import read_features
+from diagnosis.models import BASE_DIR, MODEL_FILES, load_model, load_pickled_model, score
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000]
+PAGES = ["Home", "Heart Disease", "Diabetes", "Parkinson's", "Lung Cancer", "Thyroid", "History", "About", "Contact"]
+# The History page is timed looking up this patient among HISTORY_PATIENTS
+# others, each with HISTORY_ROWS stored results
+HISTORY_PATIENT = 'bench-patient'
+HISTORY_PATIENTS = 1000
+HISTORY_ROWS = 20
+
+# Metrics where a larger value is better; everything else is a cost
+HIGHER_IS_BETTER = {'rows_per_second'}
+
+COLD_START_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from diagnosis.models import load_models
+imported = time.perf_counter()
+load_models()
+loaded = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'load_models_s': loaded - imported}))
+"""
+
+
+def record(results, benchmark, name, metric, value, unit):
+    results.append({'benchmark': benchmark, 'name': name, 'metric': metric,
+                    'value': float(value), 'unit': unit})
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(who).ru_maxrss * scale / 2 ** 20
+
+
+# Imports plus load_models() in fresh interpreters, so nothing is warm
+def bench_cold_start(results, repeats=5):
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        timings = json.loads(out.stdout.strip().splitlines()[-1])
+        timings['process_s'] = time.perf_counter() - start
+        runs.append(timings)
+    for metric in ('import_s', 'load_models_s', 'process_s'):
+        record(results, 'cold_start', 'load_models', metric.replace('_s', '_ms'),
+               np.median([r[metric] for r in runs]) * 1000, 'ms')
+    record(results, 'cold_start', 'load_models', 'peak_rss_mb', peak_rss_mb(resource.RUSAGE_CHILDREN), 'MB')
+
+
+# Single-row latency of the served model (the compiled artifact when one
+# exists) and of the original pickled estimator
+def bench_latency(results, models, samples=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    for name in models:
+        data = read_features(name)
+        rows = data[rng.integers(0, len(data), samples)]
+        for label, model in (('served', load_model(name)), ('sklearn', load_pickled_model(name))):
+            score(model, rows[:1])
+            timings = np.empty(samples)
+            for i in range(samples):
+                row = rows[i:i + 1]
+                start = time.perf_counter()
+                score(model, row)
+                timings[i] = time.perf_counter() - start
+            for p in (50, 95, 99):
+                record(results, 'latency', f"{name}:{label}", f"p{p}_us", np.percentile(timings, p) * 1e6, 'us')
+
+
+def bench_throughput(results, models, batch_sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    for name in models:
+        model = load_model(name)
+        data = read_features(name)
+        for size in batch_sizes:
+            X = np.ascontiguousarray(data[rng.integers(0, len(data), size)])
+            seconds = time_call(lambda X: score(model, X), X)
+            record(results, 'throughput', f"{name}:{size}", 'rows_per_second', size / seconds, 'rows/s')
+
+
+# A throwaway results database with HISTORY_PATIENTS patients' results
+def seed_results(path):
+    from diagnosis.store import ResultStore
+
+    rows = read_features('thyroid')
+    result_store = ResultStore(path)
+    for patient in [HISTORY_PATIENT] + [f"patient-{i}" for i in range(HISTORY_PATIENTS - 1)]:
+        for i in range(HISTORY_ROWS):
+            result_store.record('thyroid', rows[i % len(rows)], 0, 0.5, patient, source='benchmark')
+    result_store.flush()
+    result_store.close()
+
+
+# Median script rerun time per page; form pages are also timed after
+# submitting their form, which runs the model and renders the result
+def bench_pages(results, pages, repeats=3):
+    import tempfile
+
+    # The app records every submission; keep them out of the real results.db
+    tmp_dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+    os.environ['DIAGNOSIS_RESULTS_DB'] = os.path.join(tmp_dir.name, 'results.db')
+    seed_results(os.environ['DIAGNOSIS_RESULTS_DB'])
+    try:
+        run_pages(results, pages, repeats)
+    finally:
+        os.environ.pop('DIAGNOSIS_RESULTS_DB', None)
+        tmp_dir.cleanup()
+
+
+def run_pages(results, pages, repeats):
+    from streamlit.testing.v1 import AppTest
+
+    for page in pages:
+        at = AppTest.from_file(os.path.join(BASE_DIR, 'app.py'), default_timeout=120)
+        at.session_state['selected'] = page
+        at.session_state['patient_id'] = HISTORY_PATIENT
+        at.run()
+        rerun, submit = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            at.run()
+            rerun.append(time.perf_counter() - start)
+            submitter = next((b for b in at.button if b.proto.is_form_submitter), None)
+            if submitter is not None:
+                submitter.click()
+                start = time.perf_counter()
+                at.run()
+                submit.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(f"{page} page raised: {at.exception[0].value}")
+        record(results, 'page', page, 'rerun_ms', np.median(rerun) * 1000, 'ms')
+        if submit:
+            record(results, 'page', page, 'submit_ms', np.median(submit) * 1000, 'ms')
+
+
+def metadata():
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'sklearn': sklearn.__version__}
+
+
+# Relative change of every metric present in both runs; positive is worse
+def compare(results, baseline):
+    previous = {(r['benchmark'], r['name'], r['metric']): r['value'] for r in baseline['results']}
+    changes = []
+    for r in results:
+        old = previous.get((r['benchmark'], r['name'], r['metric']))
+        if not old:
+            continue
+        change = (r['value'] - old) / old
+        if r['metric'] in HIGHER_IS_BETTER:
+            change = -change
+        changes.append(dict(r, baseline=old, regression=change))
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark model loading, inference and page renders.')
+    parser.add_argument('--models', nargs='*', default=None, help=f"default: {' '.join(MODEL_FILES)}")
+    parser.add_argument('--skip', nargs='*', default=[],
+                        choices=['cold_start', 'latency', 'throughput', 'page'])
+    parser.add_argument('--max-batch', type=int, default=BATCH_SIZES[-1])
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare with the results in this file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression against the baseline (default: 0.2)')
+    args = parser.parse_args(argv)
+    models = args.models or list(MODEL_FILES)
+    unknown = set(models) - set(MODEL_FILES)
+    if unknown:
+        parser.error(f"unknown model: {', '.join(sorted(unknown))}")
+
+    warnings.filterwarnings('ignore')
+    results = []
+    if 'cold_start' not in args.skip:
+        bench_cold_start(results)
+    if 'latency' not in args.skip:
+        bench_latency(results, models)
+    if 'throughput' not in args.skip:
+        bench_throughput(results, models, [s for s in BATCH_SIZES if s <= args.max_batch])
+    if 'page' not in args.skip:
+        bench_pages(results, PAGES)
+    record(results, 'process', 'suite', 'peak_rss_mb', peak_rss_mb(), 'MB')
+
+    print(f"{'benchmark':<12}{'name':<28}{'metric':<18}{'value':>14}  unit")
+    for r in results:
+        print(f"{r['benchmark']:<12}{r['name']:<28}{r['metric']:<18}{r['value']:>14,.2f}  {r['unit']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'meta': metadata(), 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            changes = compare(results, json.load(f))
+        regressions = [c for c in changes if c['regression'] > args.tolerance]
+        print(f"\nCompared {len(changes)} metrics with {args.baseline}: "
+              f"{len(regressions)} regressed by more than {args.tolerance:.0%}")
+        for c in regressions:
+            print(f"  {c['benchmark']} {c['name']} {c['metric']}: {c['baseline']:,.2f} -> "
+                  f"{c['value']:,.2f} {c['unit']} ({c['regression']:+.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
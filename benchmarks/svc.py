@@ -0,0 +1,69 @@
+# Compare SVC.predict with the compiled scorer from diagnosis.svc on rows
+# sampled from Datasets/, for batch sizes from 1 up to 1M rows.
+#
+#     python -m benchmarks.svc [--max-batch 1000000] [--json results.json]
+import argparse
+import json
+import time
+import warnings
+
+import numpy as np
+
+from diagnosis.batch import read_features
+from diagnosis.models import load_pickled_model
+from diagnosis.svc import SVC_MODELS, compile_svc
+
+
+def time_call(fn, X, min_time=0.2, max_repeats=1000):
+    timings = []
+    total = 0.0
+    while total < min_time and len(timings) < max_repeats:
+        start = time.perf_counter()
+        fn(X)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+    return float(np.median(timings))
+
+
+def run(models, batch_sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    results = []
+    for name in models:
+        model = load_pickled_model(name)
+        scorers = {'sklearn': model.predict, 'compiled': compile_svc(model).predict}
+        if model.kernel != 'linear':
+            scorers['compiled_f32'] = compile_svc(model, np.float32).predict
+        data = read_features(name)
+        for size in batch_sizes:
+            X = np.ascontiguousarray(data[rng.integers(0, len(data), size)])
+            for label, predict in scorers.items():
+                seconds = time_call(predict, X)
+                results.append({'model': name, 'kernel': model.kernel, 'scorer': label,
+                                'batch_size': size, 'latency_ms': seconds * 1000,
+                                'rows_per_second': size / seconds})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark SVC.predict against the compiled SVC scorer.')
+    parser.add_argument('--models', nargs='*', default=None, help=f"default: {' '.join(SVC_MODELS)}")
+    parser.add_argument('--max-batch', type=int, default=1_000_000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+    batch_sizes = [10 ** i for i in range(0, 7) if 10 ** i <= args.max_batch]
+    results = run(args.models or SVC_MODELS, batch_sizes)
+
+    print(f"{'model':<12}{'scorer':<14}{'batch':>9}{'latency ms':>14}{'rows/s':>16}")
+    for r in results:
+        print(f"{r['model']:<12}{r['scorer']:<14}{r['batch_size']:>9}"
+              f"{r['latency_ms']:>14.4f}{r['rows_per_second']:>16,.0f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
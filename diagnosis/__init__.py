@@ -0,0 +1 @@
+# Inference core for Medical Diagnosis AI, importable without the Streamlit UI
@@ -0,0 +1,194 @@
+# Safe, memory-mappable model artifacts. A compiled model is a directory
+#
+#     Models/<stem>/model.json      header: kind, scalar params, classes,
+#                                   feature names, and per-array dtype/shape/sha256
+#     Models/<stem>/<array>.npy     one flat numeric array per file
+#
+# Loading never unpickles anything: the header is JSON and the arrays are read
+# with np.load(mmap_mode='r', allow_pickle=False), so every worker process maps
+# the same page-cached coefficients and support vectors instead of holding a
+# private copy, and startup costs a few file opens.
+#
+#     python -m diagnosis.artifacts            # convert every .sav and verify it
+#     python -m diagnosis.artifacts --verify   # check existing artifacts only
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import warnings
+
+import numpy as np
+
+from diagnosis.models import MODEL_FILES, compiled_path, model_path
+
+FORMAT = 'diagnosis-model'
+FORMAT_VERSION = 1
+HEADER_FILE = 'model.json'
+
+# Array dtypes an artifact may contain; anything else (notably object
+# arrays, which need pickle) is rejected on save and on load
+NUMERIC_KINDS = 'biuf'
+
+
+class ArtifactError(ValueError):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_artifact(path, kind, arrays, classes, params=None, feature_names=None, source=None):
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    header = {'format': FORMAT, 'version': FORMAT_VERSION, 'kind': kind, 'params': params or {},
+              'classes': np.asarray(classes).tolist(),
+              'feature_names': None if feature_names is None else [str(n) for n in feature_names],
+              'arrays': {}, 'source': source}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.kind not in NUMERIC_KINDS:
+            raise ArtifactError(f"Array '{name}' has non-numeric dtype {array.dtype}")
+        filename = f"{name}.npy"
+        np.save(os.path.join(tmp_path, filename), array, allow_pickle=False)
+        header['arrays'][name] = {'file': filename, 'dtype': array.dtype.str, 'shape': list(array.shape),
+                                  'sha256': file_sha256(os.path.join(tmp_path, filename))}
+    with open(os.path.join(tmp_path, HEADER_FILE), 'w') as f:
+        json.dump(header, f, indent=2)
+
+    # Swap the whole directory in. Processes that already mapped the old
+    # arrays keep reading them until they reload; the unlinked files stay valid.
+    old_path = path + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return header
+
+
+def read_header(path):
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    if header.get('format') != FORMAT:
+        raise ArtifactError(f"{path} is not a {FORMAT} artifact")
+    if header.get('version', 0) > FORMAT_VERSION:
+        raise ArtifactError(f"{path} has format version {header['version']}; "
+                            f"this code reads up to {FORMAT_VERSION}")
+    return header
+
+
+def load_artifact(path, mmap=True):
+    header = read_header(path)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        array = np.load(os.path.join(path, spec['file']), mmap_mode='r' if mmap else None, allow_pickle=False)
+        if array.dtype.kind not in NUMERIC_KINDS or array.dtype.str != spec['dtype'] \
+                or list(array.shape) != spec['shape']:
+            raise ArtifactError(f"{path}: array '{name}' does not match its header")
+        arrays[name] = array
+    return header, arrays
+
+
+def is_artifact(path):
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+def save_scorer(scorer, path, source=None):
+    kind, arrays, params = scorer.to_artifact()
+    return save_artifact(path, kind, arrays, scorer.classes_, params,
+                         getattr(scorer, 'feature_names_in_', None), source)
+
+
+def load_scorer(path, mmap=True):
+    header, arrays = load_artifact(path, mmap)
+    if header['kind'] == 'linear':
+        from diagnosis.linear import LinearScorer
+        return LinearScorer.from_artifact(header, arrays)
+    if header['kind'] == 'svc':
+        from diagnosis.svc import KernelSVCScorer
+        return KernelSVCScorer.from_artifact(header, arrays)
+    raise ArtifactError(f"Unknown model kind '{header['kind']}' in {path}")
+
+
+# Compile a fitted estimator into the fastest NumPy-only scorer
+def compile_estimator(model, dtype=np.float64):
+    from diagnosis.linear import LinearScorer
+    from diagnosis.svc import compile_svc
+
+    if hasattr(model, 'support_vectors_'):
+        return compile_svc(model, dtype)
+    if hasattr(model, 'coef_') and len(model.classes_) == 2:
+        return LinearScorer.from_estimator(model)
+    raise ArtifactError(f"Cannot compile a {type(model).__name__}")
+
+
+# Convert Models/<name>.sav into its artifact directory
+def convert(name, dtype=np.float64):
+    from diagnosis.models import load_pickled_model
+
+    scorer = compile_estimator(load_pickled_model(name), dtype)
+    source = {'file': MODEL_FILES[name], 'sha256': file_sha256(model_path(name))}
+    save_scorer(scorer, compiled_path(name), source)
+    return scorer
+
+
+# Check array checksums, then compare the artifact's predictions with the
+# pickled estimator on the model's training CSV
+def verify(name):
+    from diagnosis.batch import read_features
+    from diagnosis.models import load_pickled_model
+
+    path = compiled_path(name)
+    header = read_header(path)
+    for array_name, spec in header['arrays'].items():
+        if file_sha256(os.path.join(path, spec['file'])) != spec['sha256']:
+            raise ArtifactError(f"{path}: checksum mismatch for '{array_name}'")
+    stale = header.get('source') and header['source']['sha256'] != file_sha256(model_path(name))
+
+    X = read_features(name)
+    model = load_pickled_model(name)
+    scorer = load_scorer(path)
+    mismatches = int((scorer.predict(X) != model.predict(X)).sum())
+    max_error = float(np.abs(scorer.decision_function(X) - model.decision_function(X)).max())
+    return {'rows': len(X), 'mismatches': mismatches, 'max_decision_error': max_error, 'stale': bool(stale)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert the pickled models to mmap-able artifacts.')
+    parser.add_argument('models', nargs='*', help=f"default: {' '.join(MODEL_FILES)}")
+    parser.add_argument('--float32', action='store_true',
+                        help='store non-linear SVC support vectors as float32')
+    parser.add_argument('--verify', action='store_true', help='verify existing artifacts without converting')
+    parser.add_argument('--no-verify', action='store_true')
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODEL_FILES)
+    if unknown:
+        parser.error(f"unknown model: {', '.join(sorted(unknown))}")
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    failed = False
+    for name in args.models or MODEL_FILES:
+        if not args.verify:
+            scorer = convert(name, np.float32 if args.float32 else np.float64)
+            print(f"Converted {name} ({type(scorer).__name__}) -> {compiled_path(name)}")
+        if not args.no_verify:
+            result = verify(name)
+            print(f"  verified {result['rows']} rows: {result['mismatches']} mismatches, "
+                  f"max |ddecision| {result['max_decision_error']:.2e}"
+                  + ('  (older than its .sav; reconvert)' if result['stale'] else ''))
+            failed = failed or result['mismatches'] > 0 or result['stale']
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from diagnosis.models import MODEL_FILES, load_model, score
+from diagnosis.schema import SCHEMAS
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+# Fully-populated feature matrix for a whole CSV; the training file by
+# default, read from the parse-once dataset cache
+def read_features(disease, path=None):
+    if path is None:
+        from diagnosis.datasets import load_dataset
+        X = load_dataset(disease)[0]
+    else:
+        frame = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+        X = SCHEMAS[disease].from_frame(frame)
+    return np.ascontiguousarray(X[~np.isnan(X).any(axis=1)])
+
+
+# Rows that fail schema validation (missing or out-of-range values) are kept
+# in the output with an empty prediction and the number of offending columns.
+# With a WorkerPool (diagnosis.workers) the valid rows are scored across its
+# worker processes instead of by model.
+def score_chunk(disease, model, chunk, pool=None):
+    schema = SCHEMAS[disease]
+    X = schema.from_frame(chunk)
+    bad = schema.violations(X)
+    valid = ~bad.any(axis=1)
+
+    out = pd.DataFrame(index=chunk.index)
+    if schema.id_column in chunk:
+        out[schema.id_column] = chunk[schema.id_column]
+    out['prediction'] = pd.Series(pd.NA, index=chunk.index, dtype='Int64')
+    out['score'] = np.nan
+    out['invalid_columns'] = bad.sum(axis=1)
+    if valid.any():
+        predictions, scores = pool.score(disease, X[valid]) if pool is not None else score(model, X[valid])
+        out.loc[valid, 'prediction'] = predictions
+        out.loc[valid, 'score'] = scores
+    return out
+
+
+# Stream a CSV through one model chunk by chunk, writing results as they are
+# produced so memory stays bounded by the chunk size rather than the file size
+def score_csv(disease, input_path, output, chunk_size=DEFAULT_CHUNK_SIZE, model=None, pool=None):
+    model = model if model is not None or pool is not None else load_model(disease)
+    schema = SCHEMAS[disease]
+    usecols = set(schema.names) | {schema.id_column}
+
+    rows = 0
+    reader = pd.read_csv(input_path, chunksize=chunk_size, encoding='utf-8-sig',
+                         usecols=lambda c: c in usecols, dtype=str, keep_default_na=False)
+    for i, chunk in enumerate(reader):
+        result = score_chunk(disease, model, chunk, pool)
+        result.to_csv(output, header=(i == 0), index_label='row', float_format='%.6g')
+        rows += len(chunk)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a patient CSV with one of the diagnosis models.')
+    parser.add_argument('disease', choices=sorted(MODEL_FILES))
+    parser.add_argument('input', help='CSV shaped like the matching file in Datasets/')
+    parser.add_argument('-o', '--output', help='output CSV path (default: stdout)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                        help='score in this many worker processes (default: in this process)')
+    args = parser.parse_args(argv)
+
+    # Models fitted on DataFrames warn on every NumPy call; the schema fixes the column order
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    pool = None
+    if args.workers > 0:
+        from diagnosis.workers import WorkerPool
+        pool = WorkerPool(args.workers, [args.disease])
+
+    start = time.perf_counter()
+    try:
+        if args.output:
+            with open(args.output, 'w', newline='') as output:
+                rows = score_csv(args.disease, args.input, output, args.chunk_size, pool=pool)
+        else:
+            rows = score_csv(args.disease, args.input, sys.stdout, args.chunk_size, pool=pool)
+    finally:
+        if pool is not None:
+            pool.close()
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} rows with {args.disease} model in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
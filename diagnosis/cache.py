@@ -0,0 +1,87 @@
+# Bounded LRU/TTL cache of model outputs keyed by the exact input vector.
+# Form reruns and API clients resubmit the same values (slider defaults, small
+# tweaks) far more often than new ones, so most calls never reach the model.
+#
+# One cache per model. A cache is shared by everything holding the instance:
+# all Streamlit sessions (via st.cache_resource) or all requests in one API
+# worker process.
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from diagnosis.models import score
+
+DEFAULT_MAXSIZE = 10_000
+DEFAULT_TTL_SECONDS = 3600.0
+
+
+# Canonical key for a feature row: float64 bytes, so 1, 1.0 and np.int64(1)
+# collide and -0.0 is folded into 0.0. decimals quantizes values first, letting
+# near-identical inputs share an entry when exact matching is not required.
+def row_key(row, decimals=None):
+    row = np.asarray(row, dtype=np.float64).ravel()
+    if decimals is not None:
+        row = np.round(row, decimals)
+    return (row + 0.0).tobytes()
+
+
+class PredictionCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL_SECONDS, decimals=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.decimals = decimals
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (self.ttl is not None and now - entry[1] > self.ttl):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    # Score a matrix, sending only the rows not already cached to the model
+    # (in one vectorized call). Returns predictions and scores like models.score.
+    def score(self, model, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        keys = [row_key(row, self.decimals) for row in X]
+        results = [self.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            predictions, scores = score(model, X[missing])
+            for i, prediction, value in zip(missing, predictions, scores):
+                results[i] = (prediction, value)
+                self.put(keys[i], results[i])
+        return (np.array([r[0] for r in results]),
+                np.array([r[1] for r in results], dtype=np.float64))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self.entries), 'maxsize': self.maxsize, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0}
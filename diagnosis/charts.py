@@ -0,0 +1,126 @@
+# Plotly figures for the result pages. Plotly is imported on first use so the
+# inference core and batch jobs never pay for it.
+#
+# Each disease has one radar chart template, built and validated once per
+# process: the layout, the axis labels, and a reference trace (the median
+# patient without the condition in the training data). Rendering a result
+# only swaps the patient's values into a copy of the template, skipping
+# Plotly's per-property validation. Values are scaled to the 1st-99th
+# percentile of each feature in Datasets/, so every axis shares one 0-1
+# radial range and the raw values are shown on hover, in the units the
+# form collects them in.
+import copy
+from functools import lru_cache
+
+import numpy as np
+
+from diagnosis.features import T3_NG_ML_TO_NMOL_L, TT4_UG_DL_TO_NMOL_L
+from diagnosis.schema import SCHEMAS
+
+# (axis label, schema column) plotted for each disease
+CHART_FEATURES = {
+    'parkinsons': [
+        ('Fundamental Frequency', 'MDVP:Fo(Hz)'),
+        ('Jitter', 'MDVP:Jitter(%)'),
+        ('Shimmer', 'MDVP:Shimmer'),
+        ('NHR', 'NHR'),
+        ('HNR', 'HNR'),
+        ('DFA', 'DFA'),
+    ],
+    'heart_disease': [
+        ('Age', 'age'),
+        ('Resting BP', 'trestbps'),
+        ('Cholesterol', 'chol'),
+        ('Max Heart Rate', 'thalach'),
+        ('ST Depression', 'oldpeak'),
+        ('Major Vessels', 'ca'),
+    ],
+    'diabetes': [
+        ('Glucose', 'Glucose'),
+        ('Blood Pressure', 'BloodPressure'),
+        ('Skin Thickness', 'SkinThickness'),
+        ('Insulin', 'Insulin'),
+        ('BMI', 'BMI'),
+        ('Pedigree', 'DiabetesPedigreeFunction'),
+        ('Age', 'Age'),
+    ],
+    'lung_cancer': [
+        (SCHEMAS['lung_cancer'][name].label, name) for name in SCHEMAS['lung_cancer'].names[2:]
+    ],
+    'thyroid': [
+        ('Age', 'age'),
+        ('TSH (mU/L)', 'TSH'),
+        ('T3 (ng/mL)', 'T3'),
+        ('TT4 (µg/dL)', 'TT4'),
+    ],
+}
+
+# Model-unit divisors giving the form's units on hover
+DISPLAY_UNITS = {
+    'thyroid': {'T3': T3_NG_ML_TO_NMOL_L, 'TT4': TT4_UG_DL_TO_NMOL_L},
+}
+
+PATIENT_TRACE = dict(name='Patient', line_color='#005EB8', fillcolor='rgba(0, 94, 184, 0.3)')
+REFERENCE_TRACE = dict(name='Typical (no condition)', line_color='#888888', fillcolor='rgba(136, 136, 136, 0.15)')
+
+
+# Per-feature scaling range and reference values from the training data
+@lru_cache(maxsize=None)
+def feature_scale(disease):
+    from diagnosis.datasets import load_dataset
+
+    schema = SCHEMAS[disease]
+    columns = [schema.index[column] for _, column in CHART_FEATURES[disease]]
+    X, y, _ = load_dataset(disease)
+    X = np.asarray(X[:, columns], dtype=np.float64)
+    low, high = np.nanpercentile(X, 1, axis=0), np.nanpercentile(X, 99, axis=0)
+    high = np.where(high > low, high, low + 1.0)
+    reference = np.nanmedian(X[y != schema.positive_class], axis=0)
+    return columns, low, high, reference
+
+
+# Raw values in the units the form collects, for the hover text
+def display_values(disease, raw):
+    units = DISPLAY_UNITS.get(disease, {})
+    divisors = np.array([units.get(column, 1.0) for _, column in CHART_FEATURES[disease]])
+    return (np.asarray(raw, dtype=np.float64) / divisors).tolist()
+
+
+def scale(disease, raw):
+    _, low, high, _ = feature_scale(disease)
+    return np.clip((np.asarray(raw, dtype=np.float64) - low) / (high - low), 0.0, 1.0)
+
+
+# The validated figure, as a plain dict, for one disease
+@lru_cache(maxsize=None)
+def chart_template(disease):
+    import plotly.graph_objects as go
+
+    labels = [label for label, _ in CHART_FEATURES[disease]]
+    _, _, _, reference = feature_scale(disease)
+    hover = '%{theta}: %{customdata:.4g}<extra>%{fullData.name}</extra>'
+    fig = go.Figure()
+    for trace, raw in ((REFERENCE_TRACE, reference), (PATIENT_TRACE, reference)):
+        fig.add_trace(go.Scatterpolar(r=scale(disease, raw).tolist(), theta=labels,
+                                      customdata=display_values(disease, raw),
+                                      fill='toself', hovertemplate=hover, **trace))
+    fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 1], showticklabels=False)),
+        showlegend=True,
+        legend=dict(orientation='h', y=-0.1),
+        margin=dict(l=20, r=20, t=20, b=20),
+        height=300
+    )
+    return fig.to_dict()
+
+
+# row: the disease's feature vector in schema order (as the model gets it)
+def feature_chart(disease, row):
+    import plotly.graph_objects as go
+
+    columns, _, _, _ = feature_scale(disease)
+    raw = np.asarray(row, dtype=np.float64)[columns]
+    # Copied so no two figures (or sessions) share mutable state
+    figure = copy.deepcopy(chart_template(disease))
+    figure['data'][1].update(r=scale(disease, raw).tolist(), customdata=display_values(disease, raw))
+    return go.Figure(figure, _validate=False)
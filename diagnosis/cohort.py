@@ -0,0 +1,83 @@
+# Percentile-of-cohort context for input values. Each feature of a training
+# dataset is summarized once as a fixed grid of quantiles (QUANTILES points,
+# taken from the actual observations), so a lookup is one binary search per
+# feature (O(log QUANTILES)) whatever the size of the reference data, and the
+# index is a single small array. It is built from the parse-once dataset
+# cache, stored next to it (so it is rebuilt whenever the dataset changes) and
+# memory-mapped, so every session and worker process shares one copy.
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from diagnosis.schema import SCHEMAS
+
+QUANTILES = 1001
+# Features with fewer distinct values are codes or categories (sex, chest
+# pain type, yes/no answers), where a percentile says nothing useful
+MIN_DISTINCT = 6
+
+
+class CohortIndex:
+    # grid: (n_features, QUANTILES) quantiles per feature, ascending
+    def __init__(self, disease, grid):
+        self.disease = disease
+        self.names = SCHEMAS[disease].names
+        self.grid = grid
+        self.continuous = np.array([len(np.unique(column[~np.isnan(column)])) >= MIN_DISTINCT for column in grid])
+
+    @classmethod
+    def build(cls, disease, X, quantiles=QUANTILES):
+        probabilities = (np.arange(quantiles) + 0.5) / quantiles
+        grid = np.nanquantile(np.asarray(X, dtype=np.float64), probabilities, axis=0, method='inverted_cdf')
+        return cls(disease, np.ascontiguousarray(grid.T))
+
+    # Mid-rank percentile (0-100): ties count half, so a value equal to the
+    # whole cohort sits at the 50th percentile
+    def percentile(self, column, value):
+        grid = self.grid[column if isinstance(column, int) else self.names.index(column)]
+        if np.isnan(grid[0]) or np.isnan(value):
+            return np.nan
+        left = np.searchsorted(grid, value, 'left')
+        right = np.searchsorted(grid, value, 'right')
+        return 50.0 * (left + right) / len(grid)
+
+    def percentiles(self, row):
+        return np.array([self.percentile(j, v) for j, v in enumerate(np.asarray(row, dtype=np.float64))])
+
+
+def index_path(disease, quantiles=QUANTILES):
+    from diagnosis.datasets import cache_path
+    return os.path.join(cache_path(disease), f"cohort-{quantiles}.npy")
+
+
+# Shared per process; built on first use (or at startup via preload) and
+# saved for other processes
+@lru_cache(maxsize=None)
+def cohort_index(disease, quantiles=QUANTILES):
+    from diagnosis.datasets import load_dataset, locked
+
+    X, _, _ = load_dataset(disease)
+    path = index_path(disease, quantiles)
+    with locked(disease):
+        if not os.path.exists(path):
+            index = CohortIndex.build(disease, X, quantiles)
+            tmp_path = path + '.tmp.npy'
+            np.save(tmp_path, index.grid)
+            os.replace(tmp_path, path)
+            return index
+    return CohortIndex(disease, np.load(path, mmap_mode='r', allow_pickle=False))
+
+
+def preload(diseases=None):
+    for disease in diseases or SCHEMAS:
+        cohort_index(disease)
+
+
+def percentile_label(p):
+    p = int(round(p))
+    if 10 <= p % 100 <= 20:
+        suffix = 'th'
+    else:
+        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(p % 10, 'th')
+    return f"{p}{suffix} percentile"
@@ -0,0 +1,184 @@
+# Parse-once dataset layer for Datasets/. Each CSV is encoded through its
+# schema a single time and stored as typed columnar arrays,
+#
+#     .cache/datasets/<disease>/X.npy       float64, column-major (one contiguous column per feature)
+#     .cache/datasets/<disease>/y.npy       int64 labels
+#     .cache/datasets/<disease>/meta.json   source size + sha256, schema hash, rows, columns
+#
+# which later loads memory-map instead of re-parsing. The cache is keyed by
+# the source checksum and by the schema's encoding (column names, string
+# codes, target codes), so editing either rebuilds it. When the CSV has only
+# grown (its first `size` bytes still hash to the stored checksum), just the
+# appended rows are parsed and added; any other change rebuilds from scratch.
+import hashlib
+import io
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+
+from diagnosis.models import BASE_DIR, DATASETS_DIR, DATASET_FILES
+from diagnosis.schema import SCHEMAS
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, writes are still atomic
+    fcntl = None
+
+CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'datasets')
+CACHE_VERSION = 1
+
+
+def dataset_path(disease):
+    return os.path.join(DATASETS_DIR, DATASET_FILES[disease])
+
+
+def cache_path(disease):
+    return os.path.join(CACHE_DIR, disease)
+
+
+# sha256 of the whole file, plus of its first prefix_size bytes when given,
+# in a single read
+def checksums(path, prefix_size=None):
+    digest = hashlib.sha256()
+    prefix = None
+    remaining = prefix_size
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(1 << 20 if remaining is None or remaining <= 0 else min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None and remaining > 0:
+                remaining -= len(block)
+                if remaining == 0:
+                    prefix = digest.hexdigest()
+    if prefix_size == 0:
+        prefix = hashlib.sha256().hexdigest()
+    return digest.hexdigest(), prefix
+
+
+# Encode a CSV (path or text buffer) into (X, y); rows with no usable label
+# are dropped. Missing feature values stay NaN for the caller to handle.
+def parse(disease, source, names=None):
+    import pandas as pd
+
+    schema = SCHEMAS[disease]
+    frame = pd.read_csv(source, encoding='utf-8-sig', dtype=str, keep_default_na=False,
+                        header=0 if names is None else None, names=names)
+    X = schema.from_frame(frame)
+    target = frame[schema.target]
+    if schema.target_codes:
+        target = target.map(schema.target_codes)
+    y = pd.to_numeric(target, errors='coerce').to_numpy()
+    keep = ~np.isnan(y)
+    return X[keep], y[keep].astype(np.int64)
+
+
+# sha256 of what decides how a CSV is encoded: the schema's column names,
+# string codes and target codes
+def schema_hash(disease):
+    schema = SCHEMAS[disease]
+    encoding = [schema.names, [c.codes for c in schema.columns], schema.target, schema.target_codes]
+    return hashlib.sha256(json.dumps(encoding, sort_keys=True).encode()).hexdigest()
+
+
+def read_header_names(path):
+    import pandas as pd
+
+    return list(pd.read_csv(path, encoding='utf-8-sig', dtype=str, nrows=0).columns)
+
+
+@contextmanager
+def locked(disease):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, f"{disease}.lock"), 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_meta(disease):
+    try:
+        with open(os.path.join(cache_path(disease), 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION or meta.get('schema') != schema_hash(disease):
+        return None
+    return meta
+
+
+def write_cache(disease, X, y, meta):
+    path = cache_path(disease)
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'X.npy'), np.asfortranarray(X, dtype=np.float64))
+    np.save(os.path.join(tmp_path, 'y.npy'), np.ascontiguousarray(y, dtype=np.int64))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    old_path = path + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_cache(disease, mmap=True):
+    path = cache_path(disease)
+    mode = 'r' if mmap else None
+    return (np.load(os.path.join(path, 'X.npy'), mmap_mode=mode, allow_pickle=False),
+            np.load(os.path.join(path, 'y.npy'), mmap_mode=mode, allow_pickle=False))
+
+
+# Bring the cache up to date with the CSV: nothing to do, parse only the
+# appended tail, or rebuild. Returns how it was refreshed.
+def refresh(disease):
+    source = dataset_path(disease)
+    size = os.path.getsize(source)
+    meta = read_meta(disease)
+    if meta is not None and meta['size'] == size:
+        if checksums(source)[0] == meta['sha256']:
+            return 'cached'
+    elif meta is not None and meta['size'] < size and meta['ends_with_newline']:
+        sha256, prefix = checksums(source, meta['size'])
+        if prefix == meta['sha256']:
+            with open(source, 'rb') as f:
+                f.seek(meta['size'])
+                tail = f.read()
+            X_new, y_new = parse(disease, io.StringIO(tail.decode('utf-8')), meta['header'])
+            X_old, y_old = read_cache(disease, mmap=False)
+            meta.update(size=size, sha256=sha256, rows=meta['rows'] + len(y_new),
+                        ends_with_newline=tail.endswith(b'\n'))
+            write_cache(disease, np.vstack([X_old, X_new]), np.concatenate([y_old, y_new]), meta)
+            return 'appended'
+
+    X, y = parse(disease, source)
+    with open(source, 'rb') as f:
+        f.seek(max(size - 1, 0))
+        ends_with_newline = f.read(1) == b'\n'
+    meta = {'version': CACHE_VERSION, 'disease': disease, 'source': DATASET_FILES[disease],
+            'size': size, 'sha256': checksums(source)[0], 'schema': schema_hash(disease), 'rows': len(y),
+            'ends_with_newline': ends_with_newline, 'header': read_header_names(source),
+            'columns': SCHEMAS[disease].names}
+    write_cache(disease, X, y, meta)
+    return 'rebuilt'
+
+
+# Typed (X, y) for a training dataset, memory-mapped from the columnar cache
+# and refreshed first if the CSV changed. X may contain NaN for missing
+# values (the thyroid labs); see diagnosis.train.impute_means.
+def load_dataset(disease, mmap=True):
+    with locked(disease):
+        refresh(disease)
+        X, y = read_cache(disease, mmap)
+        meta = read_meta(disease)
+    return X, y, meta
@@ -0,0 +1,317 @@
+# Streaming drift monitoring of the feature vectors sent to each model.
+#
+# For every model and feature we keep a fixed-size histogram over bins cut at
+# the training data's quantiles (BINS equal-frequency bins from Datasets/),
+# plus counts of missing values and of values below / above anything seen in
+# training. Memory is constant whatever the traffic. Reports compare the live
+# histogram with the training one:
+#
+#     psi   population stability index, sum((live - train) * ln(live / train))
+#     ks    largest gap between the two cumulative distributions, at bin edges
+#
+# The hot path only appends the row to a per-thread buffer; every flush_rows
+# rows the buffer is folded into that thread's own counts with one
+# searchsorted per feature and a single bincount. Threads never share counts,
+# so observing takes no lock; reports add up the per-thread counts.
+#
+# Callers whose threads are short-lived (Streamlit runs every rerun on a new
+# thread) use background=True instead: observe() only queues the rows, and
+# one long-lived thread owns the counts, batching whatever has queued up and
+# folding it in as soon as the queue is empty.
+#
+#     DIAGNOSIS_DRIFT=0                            turn monitoring off
+#     DIAGNOSIS_DRIFT_EXPORT=drift.json            write the report there periodically
+#     DIAGNOSIS_DRIFT_EXPORT_SECONDS=60            ... this often
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from diagnosis.schema import SCHEMAS
+
+logger = logging.getLogger('diagnosis.drift')
+
+ENABLED = os.environ.get('DIAGNOSIS_DRIFT', '1') not in ('0', 'false', 'no', '')
+EXPORT_PATH = os.environ.get('DIAGNOSIS_DRIFT_EXPORT', '')
+EXPORT_SECONDS = float(os.environ.get('DIAGNOSIS_DRIFT_EXPORT_SECONDS', '60'))
+
+BINS = 20
+FLUSH_ROWS = 32
+# Fewer live rows than this and a feature is reported without a status
+MIN_ROWS = 100
+# Conventional PSI thresholds
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+# Floor for empty bins in the PSI logarithm
+EPSILON = 1e-4
+# Rows waiting for the background observer before new ones are dropped
+MAX_QUEUE = 10_000
+
+
+# Training-set reference: per-feature bin edges, the training rows per bin
+# and the training range. Bins of all features are laid out in one flat
+# array; feature j owns offsets[j]:offsets[j + 1].
+class Reference:
+    def __init__(self, disease, edges, counts, low, high):
+        self.disease = disease
+        self.names = SCHEMAS[disease].names
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        self.offsets = np.concatenate([[0], np.cumsum([len(e) + 1 for e in self.edges])])
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+
+    @classmethod
+    def from_data(cls, disease, X, bins=BINS):
+        X = np.asarray(X, dtype=np.float64)
+        probabilities = np.arange(1, bins) / bins
+        edges = [np.unique(np.nanquantile(X[:, j], probabilities, method='inverted_cdf'))
+                 for j in range(X.shape[1])]
+        reference = cls(disease, edges, np.zeros(0), np.nanmin(X, axis=0), np.nanmax(X, axis=0))
+        reference.counts = reference.histogram(X)
+        return reference
+
+    # Flat histogram of the non-missing values of X
+    def histogram(self, X):
+        index = []
+        for j, edges in enumerate(self.edges):
+            column = X[:, j]
+            column = column[~np.isnan(column)]
+            index.append(np.searchsorted(edges, column, 'right') + self.offsets[j])
+        return np.bincount(np.concatenate(index), minlength=self.offsets[-1]).astype(np.int64)
+
+
+@lru_cache(maxsize=None)
+def reference(disease):
+    from diagnosis.datasets import load_dataset
+
+    X, _, _ = load_dataset(disease)
+    return Reference.from_data(disease, X)
+
+
+# One thread's counts for one model
+class Sketch:
+    def __init__(self, reference):
+        self.reference = reference
+        n_features = len(reference.edges)
+        self.counts = np.zeros(reference.offsets[-1], dtype=np.int64)
+        self.missing = np.zeros(n_features, dtype=np.int64)
+        self.below = np.zeros(n_features, dtype=np.int64)
+        self.above = np.zeros(n_features, dtype=np.int64)
+        self.rows = 0
+        self.pending = []
+        self.pending_rows = 0
+
+    def add(self, X, flush_rows=FLUSH_ROWS):
+        self.pending.append(X)
+        self.pending_rows += len(X)
+        if self.pending_rows >= flush_rows:
+            self.fold()
+
+    def fold(self):
+        if not self.pending:
+            return
+        X = np.vstack(self.pending)
+        self.pending = []
+        self.pending_rows = 0
+        missing = np.isnan(X)
+        self.counts += self.reference.histogram(X)
+        self.missing += missing.sum(axis=0)
+        with np.errstate(invalid='ignore'):
+            self.below += (X < self.reference.low).sum(axis=0)
+            self.above += (X > self.reference.high).sum(axis=0)
+        self.rows += len(X)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.missing += other.missing
+        self.below += other.below
+        self.above += other.above
+        self.rows += other.rows
+
+
+def psi(expected, actual):
+    expected = np.maximum(expected / max(expected.sum(), 1), EPSILON)
+    actual = np.maximum(actual / max(actual.sum(), 1), EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks(expected, actual):
+    expected = np.cumsum(expected) / max(expected.sum(), 1)
+    actual = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(actual - expected)))
+
+
+def drift_status(value, rows):
+    if rows < MIN_ROWS:
+        return None
+    if value >= PSI_DRIFT:
+        return 'drift'
+    return 'moderate' if value >= PSI_MODERATE else 'ok'
+
+
+class DriftMonitor:
+    def __init__(self, diseases=None, flush_rows=FLUSH_ROWS, reference_loader=reference, background=False,
+                 max_queue=MAX_QUEUE):
+        self.diseases = list(diseases or SCHEMAS)
+        self.flush_rows = flush_rows
+        self.reference_loader = reference_loader
+        self.local = threading.local()
+        # (thread, disease, sketch) for every live per-thread sketch; counts
+        # of finished threads are merged into retired so memory stays bounded
+        self.sketches = []
+        self.retired = {}
+        self.references = {}
+        self.lock = threading.Lock()
+        self.exporter = None
+        self.queue = None
+        self.dropped = 0
+        if background:
+            self.queue = queue.Queue(max_queue)
+            self.observer = threading.Thread(target=self.run_observer, name='drift-observer', daemon=True)
+            self.observer.start()
+
+    def get_reference(self, disease):
+        if disease not in self.references:
+            try:
+                self.references[disease] = self.reference_loader(disease)
+            except Exception as e:  # monitoring must never fail a prediction
+                logger.warning("No drift reference for %s: %s", disease, e)
+                self.references[disease] = None
+        return self.references[disease]
+
+    def sketch(self, disease):
+        sketches = getattr(self.local, 'sketches', None)
+        if sketches is None:
+            sketches = self.local.sketches = {}
+        sketch = sketches.get(disease)
+        if sketch is None and disease not in sketches:
+            ref = self.get_reference(disease)
+            sketch = sketches[disease] = Sketch(ref) if ref is not None else None
+            if sketch is not None:
+                with self.lock:
+                    self.retire_finished()
+                    self.sketches.append((threading.current_thread(), disease, sketch))
+        return sketch
+
+    # Called under self.lock
+    def retire_finished(self):
+        live = []
+        for thread, disease, sketch in self.sketches:
+            if thread.is_alive():
+                live.append((thread, disease, sketch))
+                continue
+            sketch.fold()
+            retired = self.retired.get(disease)
+            if retired is None:
+                retired = self.retired[disease] = Sketch(sketch.reference)
+            retired.merge(sketch)
+        self.sketches = live
+
+    # X: one feature row or a matrix of rows, in schema order
+    def observe(self, disease, X):
+        if disease not in self.diseases:
+            return
+        if self.queue is not None:
+            try:
+                self.queue.put_nowait((disease, np.array(X, dtype=np.float64, ndmin=2)))
+            except queue.Full:
+                self.dropped += 1
+            return
+        self.add(disease, np.array(X, dtype=np.float64, ndmin=2))
+
+    def add(self, disease, X):
+        sketch = self.sketch(disease)
+        if sketch is not None:
+            sketch.add(X, self.flush_rows)
+
+    # The background observer: batches rows while more are queued and folds
+    # them once the queue runs dry, so nothing sits unreported
+    def run_observer(self):
+        while True:
+            disease, X = self.queue.get()
+            try:
+                self.add(disease, X)
+                if self.queue.empty():
+                    self.flush()
+            except Exception as e:  # monitoring must never stop observing
+                logger.warning("Drift observation for %s failed: %s", disease, e)
+            finally:
+                self.queue.task_done()
+
+    # Fold the calling thread's buffered rows (other threads fold their own)
+    def flush(self):
+        for sketch in getattr(self.local, 'sketches', {}).values():
+            if sketch is not None:
+                sketch.fold()
+
+    def totals(self, disease):
+        ref = self.get_reference(disease)
+        if ref is None:
+            return None
+        if self.queue is not None:
+            self.queue.join()
+        total = Sketch(ref)
+        with self.lock:
+            self.retire_finished()
+            sketches = [s for _, d, s in self.sketches if d == disease]
+            if disease in self.retired:
+                sketches.append(self.retired[disease])
+        for sketch in sketches:
+            total.merge(sketch)
+        return total
+
+    def report(self):
+        report = {'generated_at': time.time(), 'dropped': self.dropped, 'models': {}}
+        for disease in self.diseases:
+            total = self.totals(disease)
+            if total is None:
+                continue
+            ref = total.reference
+            features = {}
+            for j, name in enumerate(ref.names):
+                expected = ref.counts[ref.offsets[j]:ref.offsets[j + 1]]
+                actual = total.counts[ref.offsets[j]:ref.offsets[j + 1]]
+                value = psi(expected, actual) if actual.any() else 0.0
+                features[name] = {
+                    'psi': value,
+                    'ks': ks(expected, actual) if actual.any() else 0.0,
+                    'missing': int(total.missing[j]),
+                    'below_training_range': int(total.below[j]),
+                    'above_training_range': int(total.above[j]),
+                    'status': drift_status(value, int(actual.sum())),
+                }
+            report['models'][disease] = {
+                'rows': total.rows,
+                'drifted': [name for name, f in features.items() if f['status'] == 'drift'],
+                'features': features,
+            }
+        return report
+
+    def export(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    # Background thread writing the report every `seconds`
+    def start_export(self, path, seconds=EXPORT_SECONDS):
+        if self.exporter is not None:
+            return self.exporter
+
+        def run():
+            while True:
+                time.sleep(seconds)
+                try:
+                    self.export(path)
+                except Exception as e:
+                    logger.warning("Drift export to %s failed: %s", path, e)
+
+        self.exporter = threading.Thread(target=run, name='drift-export', daemon=True)
+        self.exporter.start()
+        return self.exporter
@@ -0,0 +1,152 @@
+# Per-prediction explanations: how much each input pushed the model towards
+# (positive) or away from (negative) detecting the disease, on the scale of
+# the model's decision function.
+#
+# Linear models (the logistic regressions, and the SVCs when fitted with a
+# linear kernel, which compile to LinearScorer) are explained exactly: the
+# contribution of feature j is coef[j] * (x[j] - baseline[j]), with the
+# baseline the training-data mean, and the contributions sum to the
+# difference between the patient's score and the baseline patient's. The
+# table is precomputed per model, so explaining a batch is one multiply.
+#
+# Other kernels are explained approximately with sampled Shapley values
+# (permutation sampling against a small background set drawn from the
+# training data). Every coalition of one explanation is scored in a single
+# decision_function call, the number of rows scored is capped by max_rows,
+# and results are cached by input row like predictions are.
+import threading
+
+import numpy as np
+
+from diagnosis.cache import PredictionCache, row_key
+from diagnosis.schema import SCHEMAS
+
+DEFAULT_TOP = 5
+BACKGROUND_ROWS = 16
+PERMUTATIONS = 16
+# Upper bound on rows scored for one sampled explanation
+MAX_ROWS = 8192
+DEFAULT_SEED = 0
+
+
+# +1 when a positive decision means the disease was detected, i.e. the
+# estimator's second class is the schema's positive class
+def detection_sign(disease, model):
+    return 1.0 if model.classes_[1] == SCHEMAS[disease].positive_class else -1.0
+
+
+class LinearExplainer:
+    exact = True
+
+    def __init__(self, disease, coef, intercept, baseline, sign=1.0):
+        self.disease = disease
+        self.weights = sign * np.asarray(coef, dtype=np.float64).ravel()
+        self.baseline = np.asarray(baseline, dtype=np.float64)
+        # Score of the baseline patient, towards detection
+        self.base_value = float(self.weights @ self.baseline + sign * np.ravel(intercept)[0])
+
+    def contributions(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return (X - self.baseline) * self.weights
+
+
+class SampledExplainer:
+    exact = False
+
+    def __init__(self, disease, model, background, sign=1.0, permutations=PERMUTATIONS,
+                 max_rows=MAX_ROWS, seed=DEFAULT_SEED, cache=None):
+        self.disease = disease
+        self.model = model
+        self.background = np.ascontiguousarray(background, dtype=np.float64)
+        self.sign = sign
+        n_features = self.background.shape[1]
+        per_permutation = len(self.background) * (n_features + 1)
+        self.permutations = max(1, min(permutations, max_rows // per_permutation))
+        self.seed = seed
+        self.cache = cache if cache is not None else PredictionCache()
+        self.base_value = float(np.mean(self.decision(self.background)))
+
+    def decision(self, X):
+        return self.sign * np.asarray(self.model.decision_function(X), dtype=np.float64)
+
+    # Shapley estimate for one row. For each sampled feature order, switching
+    # features from the background to x one at a time gives every feature its
+    # marginal effect; all (permutation, step, background row) combinations
+    # are scored together.
+    def shapley(self, x):
+        background = self.background
+        n_features = len(x)
+        rng = np.random.default_rng(self.seed)
+        orders = rng.permuted(np.tile(np.arange(n_features), (self.permutations, 1)), axis=1)
+        ranks = np.argsort(orders, axis=1)
+        # masks[p, s, j]: feature j already taken from x at step s of order p
+        masks = ranks[:, None, :] < np.arange(n_features + 1)[None, :, None]
+        Z = np.where(masks[:, :, None, :], x, background[None, None, :, :])
+        values = self.decision(Z.reshape(-1, n_features))
+        values = values.reshape(self.permutations, n_features + 1, len(background)).mean(axis=2)
+        steps = np.diff(values, axis=1)
+        return np.take_along_axis(steps, ranks, axis=1).mean(axis=0)
+
+    def contributions(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        out = np.empty_like(X)
+        for i, x in enumerate(X):
+            key = row_key(x)
+            phi = self.cache.get(key)
+            if phi is None:
+                phi = self.shapley(x)
+                self.cache.put(key, phi)
+            out[i] = phi
+        return out
+
+
+# Training rows (missing values filled with the column mean, as in
+# diagnosis.train) and the column means
+def training_data(disease):
+    from diagnosis.datasets import load_dataset
+
+    X, _, _ = load_dataset(disease)
+    X = np.asarray(X, dtype=np.float64)
+    means = np.nanmean(X, axis=0)
+    return np.where(np.isnan(X), means, X), means
+
+
+def build_explainer(disease, model, background_rows=BACKGROUND_ROWS, seed=DEFAULT_SEED):
+    X, means = training_data(disease)
+    sign = detection_sign(disease, model)
+    try:
+        coef = model.coef_
+    except AttributeError:  # non-linear SVC kernels have no coef_
+        coef = None
+    if coef is not None:
+        return LinearExplainer(disease, coef, model.intercept_, means, sign)
+    rng = np.random.default_rng(seed)
+    background = X[rng.choice(len(X), size=min(background_rows, len(X)), replace=False)]
+    return SampledExplainer(disease, model, background, sign, seed=seed)
+
+
+# One explainer per disease and loaded model, rebuilt if the model is replaced
+class Explainers:
+    def __init__(self):
+        self.explainers = {}
+        self.lock = threading.Lock()
+
+    def get(self, disease, model):
+        with self.lock:
+            entry = self.explainers.get(disease)
+            if entry is not None and entry[0] is model:
+                return entry[1]
+        explainer = build_explainer(disease, model)
+        with self.lock:
+            self.explainers[disease] = (model, explainer)
+        return explainer
+
+
+# The top features of one explanation by absolute contribution:
+# [(column, label, contribution), ...]
+def top_contributions(disease, contributions, top=DEFAULT_TOP):
+    columns = SCHEMAS[disease].columns
+    contributions = np.asarray(contributions, dtype=np.float64).ravel()
+    order = np.argsort(-np.abs(contributions), kind='stable')[:top]
+    return [(columns[j].name, columns[j].label, float(contributions[j]))
+            for j in order if contributions[j] != 0.0]
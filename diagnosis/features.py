@@ -0,0 +1,53 @@
+# Model input rows built from the values collected by the app's forms. The
+# UI passes its widget values straight through; the disease schemas
+# (diagnosis.schema) own column order and the encoding of radio/select labels.
+from diagnosis.schema import SCHEMAS
+
+# The thyroid form takes TT4 in ug/dL and T3 in ng/mL; the model was
+# trained on nmol/L
+TT4_UG_DL_TO_NMOL_L = 12.87
+T3_NG_ML_TO_NMOL_L = 1.536
+
+
+def heart_disease_features(age, sex, cp, trestbps, chol, fbs, restecg, thalach, exang, oldpeak,
+                           slope, ca, thal):
+    return SCHEMAS['heart_disease'].row({
+        'age': age, 'sex': sex, 'cp': cp, 'trestbps': trestbps, 'chol': chol, 'fbs': fbs,
+        'restecg': restecg, 'thalach': thalach, 'exang': exang, 'oldpeak': oldpeak,
+        'slope': slope, 'ca': ca, 'thal': thal,
+    })
+
+
+def diabetes_features(pregnancies, glucose, blood_pressure, skin_thickness, insulin, bmi,
+                      diabetes_pedigree_function, age):
+    return SCHEMAS['diabetes'].row({
+        'Pregnancies': pregnancies, 'Glucose': glucose, 'BloodPressure': blood_pressure,
+        'SkinThickness': skin_thickness, 'Insulin': insulin, 'BMI': bmi,
+        'DiabetesPedigreeFunction': diabetes_pedigree_function, 'Age': age,
+    })
+
+
+# values: {column name: value} for the 22 voice measurements in the schema
+def parkinsons_features(values):
+    return SCHEMAS['parkinsons'].row(values)
+
+
+# The form collects symptoms as 0/1 flags; the survey data the model was
+# trained on codes them 1 = no, 2 = yes
+def lung_cancer_features(gender, age, smoking, yellow_fingers, anxiety, peer_pressure,
+                         chronic_disease, fatigue, allergy, wheezing, alcohol_consuming, coughing,
+                         shortness_of_breath, swallowing_difficulty, chest_pain):
+    symptoms = [smoking, yellow_fingers, anxiety, peer_pressure, chronic_disease, fatigue, allergy,
+                wheezing, alcohol_consuming, coughing, shortness_of_breath, swallowing_difficulty,
+                chest_pain]
+    schema = SCHEMAS['lung_cancer']
+    values = {'GENDER': gender, 'AGE': age}
+    values.update({name: flag + 1 for name, flag in zip(schema.names[2:], symptoms)})
+    return schema.row(values)
+
+
+def thyroid_features(age, gender, on_thyroxine, tsh, t3_measured, t3, tt4):
+    return SCHEMAS['thyroid'].row({
+        'age': age, 'sex': gender, 'on thyroxine': on_thyroxine, 'TSH': tsh,
+        'T3 measured': t3_measured, 'T3': t3 * T3_NG_ML_TO_NMOL_L, 'TT4': tt4 * TT4_UG_DL_TO_NMOL_L,
+    })
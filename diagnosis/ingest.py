@@ -0,0 +1,140 @@
+# Bulk ingest of raw thyroid lab exports in the Datasets/hypothyroid.csv
+# format (30 columns, t/f flags, '?' for missing values, referral-source
+# strings), end to end: only the model's columns are parsed, each chunk is
+# encoded through the thyroid schema in one vectorized pass per column,
+# missing values are filled with the training means (as diagnosis.train
+# does), and the model prediction, lab_risk and overall_risk are computed
+# for the whole chunk at once. Memory is bounded by the chunk size, not the
+# file size.
+#
+#     python -m diagnosis.ingest labs.csv -o scored.csv
+import argparse
+import sys
+import time
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from diagnosis import risk
+from diagnosis.models import load_model, score
+from diagnosis.schema import SCHEMAS
+from diagnosis.train import impute_means
+
+DISEASE = 'thyroid'
+DEFAULT_CHUNK_SIZE = 250_000
+# Carried through to the output when present
+PASSTHROUGH_COLUMNS = ['referral source']
+
+
+# Column means of the training data, used for missing values
+@lru_cache(maxsize=None)
+def training_means():
+    from diagnosis.datasets import load_dataset
+
+    X, _, _ = load_dataset(DISEASE)
+    _, means = impute_means(np.asarray(X, dtype=np.float64))
+    return means
+
+
+# Coded columns (t/f, F/M) are read as strings; numeric columns are parsed
+# by the CSV reader itself with '?' as missing, which is several times faster
+# than converting strings afterwards. A numeric column with other junk in it
+# comes back as strings and is coerced (junk -> NaN) by Schema.from_frame.
+def read_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    schema = SCHEMAS[DISEASE]
+    wanted = set(schema.names) | set(PASSTHROUGH_COLUMNS)
+    dtype = {c.name: str for c in schema.columns if c.codes}
+    dtype.update((name, str) for name in PASSTHROUGH_COLUMNS)
+    return pd.read_csv(source, chunksize=chunk_size, encoding='utf-8-sig', usecols=lambda c: c in wanted,
+                       dtype=dtype, na_values=['?', ''], keep_default_na=False)
+
+
+# Model-ready rows for one chunk of the raw export. Returns (X, missing,
+# valid): X with missing values imputed, the mask of imputed cells, and the
+# rows whose given values are all in range. Imputed cells are not validated:
+# a mean-filled flag such as sex is fractional, exactly as in training.
+def encode_chunk(chunk, means=None):
+    schema = SCHEMAS[DISEASE]
+    means = training_means() if means is None else means
+    X = schema.from_frame(chunk)
+    missing = np.isnan(X)
+    valid = ~(schema.violations(X) & ~missing).any(axis=1)
+    X, _ = impute_means(X, means)
+    return X, missing, valid
+
+
+def score_chunk(chunk, model, means=None, pool=None):
+    X, missing, valid = encode_chunk(chunk, means)
+    out = pd.DataFrame(index=chunk.index)
+    for column in PASSTHROUGH_COLUMNS:
+        if column in chunk:
+            out[column] = chunk[column]
+    # Rows with out-of-range values are reported, not scored
+    predictions = np.zeros(len(X), dtype=np.int64)
+    scores = np.full(len(X), np.nan)
+    if valid.any():
+        predictions[valid], scores[valid] = pool.score(DISEASE, X[valid]) if pool is not None else score(model, X[valid])
+
+    # Missing labs are left out of lab_risk rather than scored as the imputed mean
+    labs = risk.thyroid_labs(X, missing)
+    lab_risk = risk.lab_risk_array(*labs)
+    overall = risk.overall_risk_array(predictions, lab_risk).astype(object)
+    overall[~valid] = None
+    out['prediction'] = pd.array(predictions, dtype='Int64')
+    out.loc[~valid, 'prediction'] = pd.NA
+    out['score'] = scores
+    for (lab, status), values in zip(risk.lab_status_arrays(*labs).items(), labs):
+        out[f'{lab} status'] = np.where(np.isnan(values), '', status)
+    out['lab_risk'] = lab_risk
+    out['overall_risk'] = overall
+    out['imputed_columns'] = missing.sum(axis=1)
+    out['valid'] = valid
+    return out
+
+
+def ingest_csv(source, output, chunk_size=DEFAULT_CHUNK_SIZE, model=None, pool=None):
+    model = model if model is not None or pool is not None else load_model(DISEASE)
+    means = training_means()
+    rows = 0
+    for i, chunk in enumerate(read_chunks(source, chunk_size)):
+        result = score_chunk(chunk, model, means, pool)
+        result.to_csv(output, header=(i == 0), index_label='row')
+        rows += len(chunk)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a raw thyroid lab export (hypothyroid.csv format) '
+                                                 'with the model and the lab risk rules.')
+    parser.add_argument('input', help='CSV shaped like Datasets/hypothyroid.csv')
+    parser.add_argument('-o', '--output', help='output CSV path (default: stdout)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                        help='score in this many worker processes (default: in this process)')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    pool = None
+    if args.workers > 0:
+        from diagnosis.workers import WorkerPool
+        pool = WorkerPool(args.workers, [DISEASE])
+
+    start = time.perf_counter()
+    try:
+        if args.output:
+            with open(args.output, 'w', newline='') as output:
+                rows = ingest_csv(args.input, output, args.chunk_size, pool=pool)
+        else:
+            rows = ingest_csv(args.input, sys.stdout, args.chunk_size, pool=pool)
+    finally:
+        if pool is not None:
+            pool.close()
+    elapsed = time.perf_counter() - start
+    print(f"Ingested {rows} lab records in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# NumPy-only scoring for the logistic-regression models (heart disease, lung
+# cancer, thyroid). A fitted LogisticRegression is just coef_, intercept_ and
+# classes_, so we export those as a model artifact (diagnosis.artifacts) next
+# to the .sav file and score with a dot product and a sigmoid, without
+# importing sklearn at runtime.
+import numpy as np
+
+
+class LinearScorer:
+    # probability=False marks scorers compiled from a linear-kernel SVC, whose
+    # margin is not a calibrated probability (diagnosis.models.score then
+    # reports decision_function, as it does for the SVC itself)
+    def __init__(self, coef, intercept, classes, feature_names=None, probability=True):
+        self.probability = bool(probability)
+        self.coef_ = np.ascontiguousarray(coef, dtype=np.float64).reshape(1, -1)
+        self.intercept_ = np.asarray(intercept, dtype=np.float64).reshape(1)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = self.coef_.shape[1]
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    @classmethod
+    def from_estimator(cls, model):
+        return cls(model.coef_, model.intercept_, model.classes_,
+                   getattr(model, 'feature_names_in_', None))
+
+    @classmethod
+    def from_artifact(cls, header, arrays):
+        return cls(arrays['coef'], arrays['intercept'], header['classes'], header['feature_names'],
+                   header['params'].get('probability', True))
+
+    def to_artifact(self):
+        return 'linear', {'coef': self.coef_, 'intercept': self.intercept_}, {'probability': self.probability}
+
+    # Same arithmetic as LinearClassifierMixin.decision_function, so the sign
+    # (and therefore predict) matches the sklearn estimator bit for bit
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return (X @ self.coef_.T + self.intercept_).ravel()
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+    def predict_proba(self, X):
+        p = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - p, p])
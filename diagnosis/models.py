@@ -0,0 +1,232 @@
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, 'Models')
+# Trained but not necessarily installed versions (see diagnosis.train)
+VERSIONS_DIR = os.path.join(MODELS_DIR, 'versions')
+DATASETS_DIR = os.path.join(BASE_DIR, 'Datasets')
+
+# Version label of the installed Models/*.sav (or its compiled artifact)
+LIVE = 'live'
+
+# Pickled model file for each disease key used throughout the app
+MODEL_FILES = {
+    'diabetes': 'diabetes_model.sav',
+    'heart_disease': 'heart_disease_model.sav',
+    'parkinsons': 'parkinsons_model.sav',
+    'lung_cancer': 'lungs_disease_model.sav',
+    'thyroid': 'Thyroid_model.sav',
+}
+
+# Training data for each model under Datasets/
+DATASET_FILES = {
+    'diabetes': 'diabetes_data.csv',
+    'heart_disease': 'heart_disease_data.csv',
+    'parkinsons': 'parkinson_data.csv',
+    'lung_cancer': 'survey lung cancer.csv',
+    'thyroid': 'hypothyroid.csv',
+}
+
+def model_path(name):
+    return os.path.join(MODELS_DIR, MODEL_FILES[name])
+
+
+def load_pickled_model(name):
+    with open(model_path(name), 'rb') as f:
+        return pickle.load(f)
+
+
+# Compiled NumPy-only artifact directory of a model (see diagnosis.artifacts)
+def compiled_path(name):
+    return os.path.join(MODELS_DIR, os.path.splitext(MODEL_FILES[name])[0])
+
+
+def load_compiled(path):
+    from diagnosis.artifacts import load_scorer
+    return load_scorer(path)
+
+
+# Prefer the compiled artifact when one has been built; it memory-maps a few
+# arrays instead of importing sklearn and unpickling the estimator
+def load_model(name):
+    from diagnosis.artifacts import is_artifact
+
+    path = compiled_path(name)
+    if is_artifact(path):
+        return load_compiled(path)
+    return load_pickled_model(name)
+
+
+# Identifies the installed model in saved results: the sha256 of its .sav,
+# which the compiled artifact records as its source
+def live_version(name):
+    from diagnosis.artifacts import file_sha256, is_artifact, read_header
+
+    path = compiled_path(name)
+    if is_artifact(path):
+        source = read_header(path).get('source')
+        if source:
+            return source['sha256']
+    return file_sha256(model_path(name))
+
+
+def version_path(name, version):
+    return os.path.join(VERSIONS_DIR, name, version)
+
+
+# A trained version from Models/versions/, compiled the same way the live
+# models are so the two can be compared on equal terms
+def load_version(name, version):
+    from diagnosis.artifacts import ArtifactError, compile_estimator
+
+    with open(os.path.join(version_path(name, version), 'model.sav'), 'rb') as f:
+        model = pickle.load(f)
+    try:
+        return compile_estimator(model)
+    except ArtifactError:
+        return model
+
+
+def load_models(names=None):
+    return {name: load_model(name) for name in (names or MODEL_FILES)}
+
+
+# Loads each model the first time it is asked for, so a worker only pays the
+# sklearn import and unpickling cost for the diseases it actually serves.
+# preload() warms the remaining models on a background thread; a request that
+# arrives mid-load waits on that model's lock instead of loading it twice.
+#
+# A disease can also have a shadow version, scored in the background on a
+# sample of requests and compared with the model that served them, and a
+# canary version, which serves a fixed percentage of inputs (see
+# diagnosis.rollout).
+class ModelRegistry:
+    def __init__(self, names=None, loader=load_model):
+        self.names = list(names or MODEL_FILES)
+        self.loader = loader
+        self.models = {}
+        self.load_times = {}
+        self.versions = {}
+        self.errors = {}
+        self.locks = {name: threading.Lock() for name in self.names}
+        self.shadows = {}
+        self.canaries = {}
+
+    def __contains__(self, name):
+        return name in self.locks
+
+    def __getitem__(self, name):
+        model = self.models.get(name)
+        if model is not None:
+            return model
+        if name not in self.locks:
+            raise KeyError(name)
+        with self.locks[name]:
+            if name not in self.models:
+                start = time.perf_counter()
+                try:
+                    self.models[name] = self.loader(name)
+                except Exception as e:
+                    self.errors[name] = e
+                    raise
+                self.versions[name] = live_version(name)
+                self.errors.pop(name, None)
+                self.load_times[name] = time.perf_counter() - start
+        return self.models[name]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def loaded(self):
+        return sorted(self.models)
+
+    def preload(self, names=None, background=True):
+        def run():
+            for name in names or self.names:
+                try:
+                    self[name]
+                except Exception:
+                    # Recorded in self.errors; the request that needs it raises
+                    pass
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name='model-preload', daemon=True)
+        thread.start()
+        return thread
+
+    def add_shadow(self, name, version, fraction=None, executor=None):
+        from diagnosis.rollout import Shadow
+
+        self.shadows[name] = Shadow(name, version, load_version(name, version), fraction, executor)
+        return self.shadows[name]
+
+    def add_canary(self, name, version, percent):
+        from diagnosis.rollout import Canary
+
+        self.canaries[name] = Canary(name, version, load_version(name, version), percent)
+        return self.canaries[name]
+
+    # The version that should serve a feature row: the canary for its share
+    # of inputs, otherwise the live model
+    def route(self, name, row):
+        canary = self.canaries.get(name)
+        if canary is not None and canary.routes(row):
+            return canary.version
+        return LIVE
+
+    def version_model(self, name, version=None):
+        if version is None or version == LIVE:
+            return self[name]
+        return self.canaries[name].model
+
+    # The model version saved with a result: a trained version's own name, or
+    # the sha256 of the live model (read without loading it, since a worker
+    # pool may be the one scoring)
+    def version_label(self, name, version=LIVE):
+        if version != LIVE:
+            return version
+        label = self.versions.get(name)
+        if label is None:
+            label = self.versions[name] = live_version(name)
+        return label
+
+    # Hand a served result to the disease's shadow, if any; returns at once
+    def shadow(self, name, row, result, version=LIVE):
+        shadow = self.shadows.get(name)
+        if shadow is not None:
+            shadow.submit(row, result, self.version_model(name, version), version)
+
+    def stats(self):
+        stats = {name: {'loaded': name in self.models,
+                        'load_seconds': self.load_times.get(name),
+                        'error': str(self.errors[name]) if name in self.errors else None}
+                 for name in self.names}
+        for name, shadow in self.shadows.items():
+            stats[name]['shadow'] = shadow.stats()
+        for name, canary in self.canaries.items():
+            stats[name]['canary'] = canary.stats()
+        return stats
+
+
+# Vectorized scoring of a 2-D feature matrix. Returns the predicted labels and
+# a positive-class score: predict_proba where the estimator supports it, the
+# raw decision function otherwise (the SVC models are fitted without
+# probability=True).
+def score(model, X):
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    predictions = model.predict(X)
+    if getattr(model, 'probability', True) and hasattr(model, 'predict_proba'):
+        scores = model.predict_proba(X)[:, 1]
+    else:
+        scores = model.decision_function(X)
+    return predictions, scores
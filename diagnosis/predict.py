@@ -0,0 +1,27 @@
+from diagnosis.cache import PredictionCache
+from diagnosis.models import MODEL_FILES, ModelRegistry
+
+
+# Model calls for the app: lazily loaded models behind per-model prediction
+# caches. One instance is meant to be shared by every session. Inputs are
+# passed to the drift monitor, if one is given, and results to the disease's
+# shadow model, if the registry has one. Canary routing is left to the HTTP
+# service; the app always serves the live models.
+class Predictor:
+    def __init__(self, registry=None, caches=None, drift_monitor=None):
+        self.registry = registry or ModelRegistry()
+        self.caches = caches if caches is not None else {name: PredictionCache() for name in MODEL_FILES}
+        self.drift = drift_monitor
+
+    def score(self, name, features):
+        if self.drift is not None:
+            self.drift.observe(name, features)
+        predictions, scores = self.caches[name].score(self.registry[name], features)
+        if name in self.registry.shadows:
+            for row, prediction, value in zip(features, predictions, scores):
+                self.registry.shadow(name, row, (prediction, value))
+        return predictions, scores
+
+    def predict(self, name, features):
+        predictions, _ = self.score(name, features)
+        return predictions
@@ -0,0 +1,114 @@
+# Opt-in timing of page render stages and model calls.
+#
+# Enable with DIAGNOSIS_PROFILE=1 (or ?profile=1 in the app URL). Each
+# Streamlit rerun gets a Profiler; finished renders are logged as one JSON
+# line on the 'diagnosis.profiling' logger and folded into process-wide
+# Prometheus-style counters (metrics_text()). When profiling is off, stage()
+# hands back a shared no-op context manager and lap() returns immediately, so
+# the instrumented code pays roughly one attribute check per call site.
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger('diagnosis.profiling')
+
+ENABLED = os.environ.get('DIAGNOSIS_PROFILE', '0') not in ('0', 'false', 'no', '')
+
+_NULL_CONTEXT = nullcontext()
+
+# stage -> [count, total seconds, max seconds], shared by all renders in the process
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def record(stage, seconds):
+    with _metrics_lock:
+        entry = _metrics.get(stage)
+        if entry is None:
+            _metrics[stage] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+
+def metrics_snapshot():
+    with _metrics_lock:
+        return {stage: {'count': c, 'seconds_total': t, 'seconds_max': m}
+                for stage, (c, t, m) in _metrics.items()}
+
+
+# Prometheus text exposition of the accumulated stage timings
+def metrics_text(prefix='diagnosis_stage'):
+    snapshot = sorted(metrics_snapshot().items())
+    labels = [stage.replace('\\', '\\\\').replace('"', '\\"') for stage, _ in snapshot]
+    lines = [f'# HELP {prefix}_seconds Time spent per render stage or model call',
+             f'# TYPE {prefix}_seconds summary']
+    for label, (_, values) in zip(labels, snapshot):
+        lines.append(f'{prefix}_seconds_count{{stage="{label}"}} {values["count"]}')
+        lines.append(f'{prefix}_seconds_sum{{stage="{label}"}} {values["seconds_total"]:.6f}')
+    lines += [f'# HELP {prefix}_max_seconds Slowest observation per render stage or model call',
+              f'# TYPE {prefix}_max_seconds gauge']
+    for label, (_, values) in zip(labels, snapshot):
+        lines.append(f'{prefix}_max_seconds{{stage="{label}"}} {values["seconds_max"]:.6f}')
+    return '\n'.join(lines) + '\n'
+
+
+class Profiler:
+    def __init__(self, enabled=ENABLED, name='render'):
+        self.enabled = enabled
+        self.name = name
+        self.timings = []
+        self.start = self.last = time.perf_counter() if enabled else 0.0
+
+    # Time a block: with profiler.stage('predict:thyroid'): ...
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.add(name, end - start)
+            self.last = end
+
+    # Attribute the time since the previous lap/stage to name, for marking
+    # sections of straight-line page code without re-indenting it
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.add(name, now - self.last)
+        self.last = now
+
+    def add(self, name, seconds):
+        self.timings.append((name, seconds))
+        record(name, seconds)
+
+    def total(self):
+        return time.perf_counter() - self.start if self.enabled else 0.0
+
+    def breakdown(self):
+        total = self.total()
+        return [{'stage': name, 'ms': round(seconds * 1000, 3),
+                 'share': f"{seconds / total:.1%}" if total else '-'}
+                for name, seconds in self.timings]
+
+    def finish(self, **fields):
+        if not self.enabled:
+            return None
+        total = self.total()
+        record(self.name, total)
+        entry = {'event': self.name, 'total_ms': round(total * 1000, 3),
+                 'stages': {name: round(seconds * 1000, 3) for name, seconds in self.timings}}
+        entry.update(fields)
+        logger.info(json.dumps(entry))
+        return entry
@@ -0,0 +1,230 @@
+# Text and PDF reports for assessment results, for all five diseases.
+#
+# A Report is plain data (patient fields and results, as label/value pairs)
+# and is keyed by a hash of that content. PDFs are rendered on a worker pool
+# (ReportRenderer) only when one is asked for, and each distinct result is
+# rendered once: repeated downloads of the same result come from the cache.
+# ReportLab is imported only inside the workers.
+#
+#     python -m diagnosis.reports thyroid patients.csv -o reports.zip   # bulk export
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from io import BytesIO
+
+from diagnosis.schema import SCHEMAS
+
+REPORT_TITLES = {
+    'heart_disease': "Heart Disease Assessment Report",
+    'diabetes': "Diabetes Assessment Report",
+    'parkinsons': "Parkinson's Disease Assessment Report",
+    'lung_cancer': "Lung Cancer Risk Assessment Report",
+    'thyroid': "Thyroid Assessment Report",
+}
+
+# Result wording per disease: (not detected, detected)
+PREDICTION_LABELS = {
+    'heart_disease': ("No Heart Disease Detected", "Heart Disease Detected"),
+    'diabetes': ("No Diabetes Detected", "Diabetes Detected"),
+    'parkinsons': ("No Parkinson's Disease Detected", "Parkinson's Disease Detected"),
+    'lung_cancer': ("Low Risk of Lung Cancer", "High Risk of Lung Cancer"),
+    'thyroid': ("Thyroid Dysfunction Not Indicated", "Thyroid Dysfunction Indicated"),
+}
+
+DEFAULT_CACHE_SIZE = 256
+# Bulk export: CSV rows read at a time, and PDFs rendered but not yet zipped
+DEFAULT_CHUNK_SIZE = 10_000
+DEFAULT_WINDOW = 256
+UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+class Report:
+    def __init__(self, disease, patient, results, title=None):
+        self.disease = disease
+        self.title = title or REPORT_TITLES[disease]
+        self.patient = [(str(label), str(value)) for label, value in patient.items()]
+        self.results = [(str(label), str(value)) for label, value in results.items()]
+
+    # Content hash: equal results share one rendered PDF
+    def key(self):
+        content = json.dumps([self.disease, self.title, self.patient, self.results])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def filename(self, prefix=None):
+        return f"{prefix}-{self.disease}_report.pdf" if prefix is not None else f"{self.disease}_assessment_report.pdf"
+
+    def text(self):
+        lines = [self.title, "", "Patient Information:"]
+        lines += [f"{label}: {value}" for label, value in self.patient]
+        lines += ["", "Results:"]
+        lines += [f"{label}: {value}" for label, value in self.results]
+        return "\n".join(lines)
+
+
+def prediction_label(disease, prediction):
+    return PREDICTION_LABELS[disease][int(prediction == SCHEMAS[disease].positive_class)]
+
+
+def thyroid_report(age, gender, on_thyroxine, tsh, t3, tt4, overall_risk):
+    return Report('thyroid', {'Age': age, 'Gender': gender, 'On Thyroxine': on_thyroxine,
+                              'TSH': tsh, 'T3': t3, 'TT4': tt4},
+                  {'Overall Risk': overall_risk})
+
+
+# Runs on a worker; module-level so process pools can pickle it
+def render_pdf(report):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    y = 750
+    c.drawString(100, y, report.title)
+    for heading, fields in (("Patient Information", report.patient), ("Results", report.results)):
+        y -= 30
+        c.drawString(100, y, f"{heading}:")
+        for label, value in fields:
+            y -= 20
+            if y < 60:
+                c.showPage()
+                y = 750
+            c.drawString(100, y, f"{label}: {value}")
+    c.save()
+    return buffer.getvalue()
+
+
+# PDF rendering off the request path. submit() returns at once with a future
+# for the report's PDF; a report already rendered (or in progress) returns the
+# same future, so nothing is built twice. The cache keeps the most recent
+# cache_size results. Pass a ProcessPoolExecutor for CPU-parallel bulk jobs.
+class ReportRenderer:
+    def __init__(self, max_workers=2, cache_size=DEFAULT_CACHE_SIZE, executor=None):
+        self.executor = executor or ThreadPoolExecutor(max_workers, thread_name_prefix='report')
+        self.cache_size = cache_size
+        self.futures = OrderedDict()
+        self.lock = threading.Lock()
+        self.rendered = 0
+        self.hits = 0
+
+    def submit(self, report):
+        key = report.key()
+        with self.lock:
+            future = self.futures.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self.futures.move_to_end(key)
+                self.hits += 1
+                return future
+            future = self.executor.submit(render_pdf, report)
+            self.rendered += 1
+            self.futures[key] = future
+            while len(self.futures) > self.cache_size:
+                self.futures.popitem(last=False)
+        return future
+
+    def render(self, report, timeout=None):
+        return self.submit(report).result(timeout)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {'cached': len(self.futures), 'rendered': self.rendered, 'hits': self.hits}
+
+
+# Render reports in parallel and write them to a zip as each one finishes.
+# reports is an iterable of (name, Report), consumed lazily: at most `window`
+# distinct renders are in flight, and each PDF is dropped once it is in the
+# zip, so memory does not grow with the number of reports. Returns the
+# number written.
+def export_zip(reports, output, renderer, window=DEFAULT_WINDOW):
+    # Identical reports in flight share one future (and one render) but keep their names
+    pending = {}
+    written = 0
+
+    def write(done):
+        nonlocal written
+        for future in done:
+            pdf = future.result()
+            for name in pending.pop(future):
+                archive.writestr(name, pdf)
+                written += 1
+
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, report in reports:
+            pending.setdefault(renderer.submit(report), []).append(name)
+            if len(pending) >= window:
+                write(wait(pending, return_when=FIRST_COMPLETED).done)
+        while pending:
+            write(wait(pending, return_when=FIRST_COMPLETED).done)
+    return written
+
+
+# Zip entry name from a CSV identifier: path separators, '..' and other
+# unsafe characters cannot create nested or escaping entries
+def safe_name(value):
+    name = UNSAFE_NAME_CHARS.sub('_', str(value)).strip('._')
+    return name or 'patient'
+
+
+# One report per valid row of a CSV shaped like the disease's dataset,
+# scored the same way as diagnosis.batch, read and yielded chunk by chunk
+def reports_for_csv(disease, path, model=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    import numpy as np
+    import pandas as pd
+
+    from diagnosis import risk
+    from diagnosis.batch import score_chunk
+    from diagnosis.models import load_model
+
+    schema = SCHEMAS[disease]
+    model = model if model is not None else load_model(disease)
+    reader = pd.read_csv(path, chunksize=chunk_size, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    for frame in reader:
+        scored = score_chunk(disease, model, frame)
+        if disease == 'thyroid':
+            # The rule tables score the whole chunk at once; unscored rows are skipped below
+            predictions = scored['prediction'].to_numpy(dtype=np.float64, na_value=np.nan)
+            lab_risk = risk.lab_risk_array(*risk.thyroid_labs(schema.from_frame(frame)))
+            overall_risk = risk.overall_risk_array(predictions, lab_risk)
+        for i, (index, row) in enumerate(scored.iterrows()):
+            if pd.isna(row['prediction']):
+                continue
+            prediction = int(row['prediction'])
+            results = {'Prediction': prediction_label(disease, prediction), 'Score': f"{row['score']:.4f}"}
+            if disease == 'thyroid':
+                results['Overall Risk'] = str(overall_risk[i])
+            patient = {c.label: frame.at[index, c.name] for c in schema.columns}
+            report = Report(disease, patient, results)
+            prefix = safe_name(row[schema.id_column]) if schema.id_column in scored else index
+            yield report.filename(prefix), report
+
+
+def main(argv=None):
+    import warnings
+
+    parser = argparse.ArgumentParser(description='Score a CSV and export one PDF report per patient as a zip.')
+    parser.add_argument('disease', choices=sorted(SCHEMAS))
+    parser.add_argument('input', help='CSV with the columns of the matching file in Datasets/')
+    parser.add_argument('-o', '--output', default='reports.zip')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    reports = reports_for_csv(args.disease, args.input, chunk_size=args.chunk_size)
+    renderer = ReportRenderer(executor=ProcessPoolExecutor(max(1, args.jobs)), cache_size=DEFAULT_WINDOW)
+    try:
+        written = export_zip(reports, args.output, renderer)
+    finally:
+        renderer.executor.shutdown()
+    print(f"Wrote {written} reports to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
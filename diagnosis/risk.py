@@ -0,0 +1,95 @@
+# Rule-based thyroid risk scoring that complements the model prediction. The
+# rules are data: reference ranges per lab and an ordered overall-risk table,
+# compiled to diagnosis.rules tables. The scalar functions (the app, the
+# screening panel) and the *_array versions (bulk scoring, diagnosis.ingest)
+# evaluate the same tables.
+import numpy as np
+
+from diagnosis.features import T3_NG_ML_TO_NMOL_L, TT4_UG_DL_TO_NMOL_L
+from diagnosis.rules import RuleTable, range_table
+from diagnosis.schema import SCHEMAS
+
+# Reference ranges used for the lab value analysis (TSH mU/L, T3 ng/mL, TT4 ug/dL)
+LAB_RANGES = {
+    'TSH': (0.4, 4.0),
+    'T3': (0.8, 2.0),
+    'TT4': (5.0, 12.0),
+}
+
+# What each lab status may indicate
+LAB_INTERPRETATIONS = {
+    'TSH': {'Low': 'May indicate hyperthyroidism', 'High': 'May indicate hypothyroidism'},
+    'T3': {'Low': 'May indicate hypothyroidism', 'High': 'May indicate hyperthyroidism'},
+    'TT4': {'Low': 'May indicate hypothyroidism', 'High': 'May indicate hyperthyroidism'},
+}
+NORMAL_INTERPRETATION = 'Within reference range'
+
+# The thyroid model's output for a hypothyroid patient
+POSITIVE = SCHEMAS['thyroid'].positive_class
+
+# First matching rule wins. prediction is the thyroid model's class,
+# lab_risk the number of labs out of range.
+OVERALL_RISK_RULES = [
+    ('High', [('prediction', '==', POSITIVE), ('lab_risk', '>=', 2)]),
+    ('High', [('prediction', '==', POSITIVE), ('symptom_score', '>=', 5)]),
+    ('Moderate', [('prediction', '==', POSITIVE)]),
+    ('Moderate', [('prediction', '!=', POSITIVE), ('lab_risk', '>=', 3), ('symptom_score', '>=', 6)]),
+]
+
+LAB_TABLES = {lab: range_table(lab, low, high) for lab, (low, high) in LAB_RANGES.items()}
+OVERALL_RISK = RuleTable(OVERALL_RISK_RULES, default='Low')
+
+
+def lab_status(lab, value):
+    return LAB_TABLES[lab](**{lab: value})
+
+
+def lab_statuses(tsh, t3, tt4):
+    return {'TSH': lab_status('TSH', tsh), 'T3': lab_status('T3', t3), 'TT4': lab_status('TT4', tt4)}
+
+
+def lab_interpretation(lab, status):
+    return NORMAL_INTERPRETATION if status == 'Normal' else LAB_INTERPRETATIONS[lab][status]
+
+
+# Number of lab values outside their reference range
+def lab_risk(tsh, t3, tt4):
+    return int(lab_risk_array(tsh, t3, tt4))
+
+
+# Combine the model prediction, lab value risk and symptom score into
+# Low / Moderate / High
+def overall_risk(prediction, lab_risk, symptom_score=0):
+    return OVERALL_RISK(prediction=prediction, lab_risk=lab_risk, symptom_score=symptom_score)
+
+
+# Status arrays per lab; missing (NaN) values are Normal
+def lab_status_arrays(tsh, t3, tt4):
+    values = {'TSH': tsh, 'T3': t3, 'TT4': tt4}
+    return {lab: table.evaluate(**{lab: values[lab]}) for lab, table in LAB_TABLES.items()}
+
+
+# Out-of-range lab count for arrays of labs; missing (NaN) values count as normal
+def lab_risk_array(tsh, t3, tt4):
+    values = {'TSH': tsh, 'T3': t3, 'TT4': tt4}
+    return sum(table.matched(**{lab: values[lab]}).astype(np.int64) for lab, table in LAB_TABLES.items())
+
+
+def overall_risk_array(prediction, lab_risk, symptom_score=0):
+    return OVERALL_RISK.evaluate(prediction=prediction, lab_risk=lab_risk, symptom_score=symptom_score)
+
+
+# (TSH, T3, TT4) columns from thyroid model rows, in the units the rules use
+# (T3 back to ng/mL, TT4 to ug/dL); cells flagged in `missing` become NaN
+def thyroid_labs(X, missing=None):
+    schema = SCHEMAS['thyroid']
+    X = np.asarray(X, dtype=np.float64)
+    labs = []
+    for name in ('TSH', 'T3', 'TT4'):
+        column = X[..., schema.index[name]]
+        if missing is not None:
+            column = np.where(missing[..., schema.index[name]], np.nan, column)
+        labs.append(column)
+    labs[1] = labs[1] / T3_NG_ML_TO_NMOL_L
+    labs[2] = labs[2] / TT4_UG_DL_TO_NMOL_L
+    return labs
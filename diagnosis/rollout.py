@@ -0,0 +1,179 @@
+# Shadow and canary evaluation of trained versions (Models/versions/, see
+# diagnosis.train) against the live models, on real traffic.
+#
+# A shadow version sees a sampled fraction of requests after the response has
+# been produced: the row is scored again by the model that served it and by
+# the shadow, on a small background pool, and agreement and per-row latency
+# are accumulated for that version pair. When the pool is backed up, samples
+# are dropped rather than queued, so a shadow never adds latency.
+#
+# A canary version serves a fixed percentage of inputs. Rows are assigned by
+# a hash of the feature values, so the same input always gets the same
+# version and the prediction caches stay consistent.
+#
+#     DIAGNOSIS_SHADOW=thyroid=20261017-093000,diabetes=v2:0.25   version[:fraction] per disease
+#     DIAGNOSIS_SHADOW_FRACTION=0.1                                default fraction
+#     DIAGNOSIS_CANARY=heart_disease=v2:5                          version:percent per disease
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from diagnosis.cache import row_key
+from diagnosis.models import LIVE, MODEL_FILES, score
+
+SHADOW = os.environ.get('DIAGNOSIS_SHADOW', '')
+CANARY = os.environ.get('DIAGNOSIS_CANARY', '')
+SHADOW_FRACTION = float(os.environ.get('DIAGNOSIS_SHADOW_FRACTION', '0.1'))
+SHADOW_WORKERS = 1
+# Samples waiting for the pool before new ones are dropped
+MAX_PENDING = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# One pool for every shadow in the process
+def shadow_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(SHADOW_WORKERS, thread_name_prefix='shadow')
+        return _executor
+
+
+class PairStats:
+    def __init__(self):
+        self.compared = 0
+        self.agreed = 0
+        self.score_diff = 0.0
+        self.served_seconds = 0.0
+        self.shadow_seconds = 0.0
+
+    def as_dict(self):
+        n = self.compared or 1
+        return {
+            'compared': self.compared,
+            'agreement_rate': self.agreed / n if self.compared else None,
+            'mean_abs_score_diff': self.score_diff / n if self.compared else None,
+            'served_us': 1e6 * self.served_seconds / n if self.compared else None,
+            'shadow_us': 1e6 * self.shadow_seconds / n if self.compared else None,
+            'latency_delta_us': 1e6 * (self.shadow_seconds - self.served_seconds) / n if self.compared else None,
+        }
+
+
+class Shadow:
+    def __init__(self, disease, version, model, fraction=None, executor=None,
+                 max_pending=MAX_PENDING, seed=None):
+        self.disease = disease
+        self.version = version
+        self.model = model
+        self.fraction = SHADOW_FRACTION if fraction is None else float(fraction)
+        self.executor = executor or shadow_executor()
+        self.max_pending = max_pending
+        self.random = random.Random(seed)
+        # served version -> PairStats
+        self.pairs = {}
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.sampled = 0
+        self.dropped = 0
+        self.errors = 0
+
+    # result: the (prediction, score) already returned for row
+    def submit(self, row, result, served_model, served_version=LIVE):
+        if self.random.random() >= self.fraction:
+            return None
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return None
+            self.pending += 1
+            self.sampled += 1
+        return self.executor.submit(self.compare, row, result, served_model, served_version)
+
+    # Both models score the row here, one after the other, so their
+    # latencies are measured under the same conditions
+    def compare(self, row, result, served_model, served_version):
+        try:
+            X = np.array(row, dtype=np.float64, ndmin=2)
+            start = time.perf_counter()
+            score(served_model, X)
+            served_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            predictions, scores = score(self.model, X)
+            shadow_seconds = time.perf_counter() - start
+            with self.lock:
+                pair = self.pairs.get(served_version)
+                if pair is None:
+                    pair = self.pairs[served_version] = PairStats()
+                pair.compared += 1
+                pair.agreed += int(predictions[0] == result[0])
+                pair.score_diff += abs(float(scores[0]) - float(result[1]))
+                pair.served_seconds += served_seconds
+                pair.shadow_seconds += shadow_seconds
+        except Exception:
+            with self.lock:
+                self.errors += 1
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def stats(self):
+        with self.lock:
+            return {'version': self.version, 'fraction': self.fraction, 'sampled': self.sampled,
+                    'dropped': self.dropped, 'errors': self.errors,
+                    'pairs': {f"{served}->{self.version}": pair.as_dict() for served, pair in self.pairs.items()}}
+
+
+class Canary:
+    def __init__(self, disease, version, model, percent):
+        if not 0 <= percent <= 100:
+            raise ValueError(f"Canary percentage must be between 0 and 100, got {percent}")
+        self.disease = disease
+        self.version = version
+        self.model = model
+        self.percent = float(percent)
+        self.threshold = int(self.percent / 100 * 2 ** 64)
+        self.routed = 0
+        self.served = 0
+
+    def routes(self, row):
+        digest = hashlib.blake2b(row_key(row), digest_size=8).digest()
+        selected = int.from_bytes(digest, 'big') < self.threshold
+        # Plain counters: a lost increment under contention only blurs the stats
+        self.routed += 1
+        self.served += selected
+        return selected
+
+    def stats(self):
+        return {'version': self.version, 'percent': self.percent, 'routed': self.routed,
+                'served': self.served}
+
+
+# "thyroid=v2:0.25,diabetes=v3" -> {'thyroid': ('v2', 0.25), 'diabetes': ('v3', None)}
+def parse_spec(text):
+    spec = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        disease, _, rest = item.partition('=')
+        version, _, value = rest.partition(':')
+        disease, version = disease.strip(), version.strip()
+        if disease not in MODEL_FILES or not version:
+            raise ValueError(f"Expected <disease>=<version>[:<value>], got '{item}'")
+        spec[disease] = (version, float(value) if value else None)
+    return spec
+
+
+# Apply DIAGNOSIS_SHADOW / DIAGNOSIS_CANARY (or the given specs) to a registry
+def configure(registry, shadow=SHADOW, canary=CANARY):
+    for disease, (version, fraction) in parse_spec(shadow).items():
+        registry.add_shadow(disease, version, fraction)
+    for disease, (version, percent) in parse_spec(canary).items():
+        if percent is None:
+            raise ValueError(f"Canary for {disease} needs a percentage: {disease}={version}:<percent>")
+        registry.add_canary(disease, version, percent)
+    return registry
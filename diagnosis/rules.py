@@ -0,0 +1,78 @@
+# Declarative rule tables, evaluated column-wise with NumPy. A rule is an
+# outcome plus a list of (field, operator, value) conditions that must all
+# hold; a table is an ordered list of rules where the first matching rule
+# wins and rows no rule matches get the default:
+#
+#     table = RuleTable([
+#         ('High', [('lab_risk', '>=', 2)]),
+#         ('Moderate', [('lab_risk', '>=', 1)]),
+#     ], default='Low')
+#     table.evaluate(lab_risk=np.array([0, 1, 3]))   # ['Low', 'Moderate', 'High']
+#     table(lab_risk=1)                              # 'Moderate'
+#
+# Each condition becomes one comparison over the whole column and each rule
+# one boolean mask, so a table costs the same handful of array operations
+# for one row (the app) or a million (diagnosis.ingest). Comparisons with
+# NaN are false, so missing values fall through to later rules.
+import numpy as np
+
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+class RuleTable:
+    def __init__(self, rules, default):
+        self.rules = []
+        for outcome, conditions in rules:
+            conditions = [tuple(c) for c in conditions]
+            for field, op, value in conditions:
+                if op not in OPERATORS:
+                    raise ValueError(f"Unknown operator '{op}' in rule for {outcome}")
+            self.rules.append((outcome, conditions))
+        self.default = default
+        self.outcomes = [outcome for outcome, _ in self.rules]
+        self.fields = sorted({field for _, conditions in self.rules for field, _, _ in conditions})
+
+    # One boolean mask per rule: where all of its conditions hold
+    def masks(self, **columns):
+        missing = [field for field in self.fields if field not in columns]
+        if missing:
+            raise KeyError(f"Missing rule fields: {', '.join(missing)}")
+        columns = {field: np.asarray(columns[field]) for field in self.fields}
+        shape = np.broadcast_shapes(*(column.shape for column in columns.values()))
+        masks = []
+        with np.errstate(invalid='ignore'):
+            for _, conditions in self.rules:
+                mask = np.ones(shape, dtype=bool)
+                for field, op, value in conditions:
+                    mask &= OPERATORS[op](columns[field], value)
+                masks.append(mask)
+        return masks, shape
+
+    # Outcome for every row; columns are arrays (or scalars) keyed by field
+    def evaluate(self, **columns):
+        masks, shape = self.masks(**columns)
+        if not masks:
+            return np.full(shape, self.default)
+        return np.select(masks, self.outcomes, self.default)
+
+    # Where some rule matched, i.e. the outcome is not the default
+    def matched(self, **columns):
+        masks, shape = self.masks(**columns)
+        return np.logical_or.reduce(masks) if masks else np.zeros(shape, dtype=bool)
+
+    # Scalar inputs give a plain outcome, arrays an array of outcomes
+    def __call__(self, **columns):
+        result = self.evaluate(**columns)
+        return result.item() if result.ndim == 0 else result
+
+
+# Low / High / Normal status of a field against a reference range
+def range_table(field, low, high):
+    return RuleTable([('Low', [(field, '<', low)]), ('High', [(field, '>', high)])], 'Normal')
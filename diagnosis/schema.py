@@ -0,0 +1,191 @@
+# Declared input schema for each disease model: column order (the order the
+# model was trained on, matching the CSV headers under Datasets/), dtype,
+# valid range and string encodings. Every entry point builds its float64
+# feature matrix here, from UI values, JSON records or a CSV chunk, and the
+# same ranges drive validation, column-wise over the whole matrix.
+import math
+
+import numpy as np
+
+SEX_FEMALE_1 = {'F': 1, 'M': 0, 'Female': 1, 'Male': 0}
+SEX_MALE_1 = {'M': 1, 'F': 0, 'Male': 1, 'Female': 0}
+YES_NO = {'Yes': 1, 'No': 0}
+TRUE_FALSE = {'t': 1, 'f': 0, 'Yes': 1, 'No': 0}
+# Lung cancer survey answers are coded 1 = no, 2 = yes
+SURVEY = {'NO': 1, 'YES': 2, 'No': 1, 'Yes': 2}
+
+
+class Column:
+    def __init__(self, name, label, low, high, dtype='float', codes=None, default=None, step=None):
+        self.name = name
+        self.label = label
+        self.low = low
+        self.high = high
+        self.dtype = dtype
+        self.codes = codes or {}
+        self.default = default if default is not None else low
+        self.step = step if step is not None else (1 if dtype == 'int' else None)
+        # printf format matching the step, for sliders and summaries
+        decimals = 0 if not self.step or self.step >= 1 else -math.floor(math.log10(self.step))
+        self.format = f"%.{decimals}f"
+
+    def encode(self, value):
+        if isinstance(value, str):
+            if value in self.codes:
+                return float(self.codes[value])
+            try:
+                return float(value)
+            except ValueError:
+                return math.nan
+        return math.nan if value is None else float(value)
+
+
+class Schema:
+    # positive_class is the model output meaning the disease was detected
+    def __init__(self, disease, columns, target=None, target_codes=None, id_column=None, positive_class=1):
+        self.disease = disease
+        self.columns = columns
+        self.target = target
+        self.target_codes = target_codes
+        self.id_column = id_column
+        self.positive_class = positive_class
+        self.names = [c.name for c in columns]
+        self.index = {c.name: i for i, c in enumerate(columns)}
+        self.low = np.array([c.low for c in columns], dtype=np.float64)
+        self.high = np.array([c.high for c in columns], dtype=np.float64)
+        self.integer = np.array([c.dtype in ('int', 'binary') for c in columns])
+        self.defaults = np.array([c.default for c in columns], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __getitem__(self, name):
+        return self.columns[self.index[name]]
+
+    # One row from a {column: value} mapping, e.g. the values of a form
+    def row(self, values):
+        missing = [name for name in self.names if name not in values]
+        if missing:
+            raise KeyError(f"Missing {self.disease} features: {', '.join(missing)}")
+        return np.array([c.encode(values[c.name]) for c in self.columns], dtype=np.float64)
+
+    # Matrix from JSON-style input: a list of {column: value} records or of
+    # positional lists already in schema order
+    def from_records(self, records):
+        if not records:
+            return np.empty((0, len(self)), dtype=np.float64)
+        if isinstance(records[0], dict):
+            return np.array([self.row(r) for r in records], dtype=np.float64)
+        X = np.array([[c.encode(v) for c, v in zip(self.columns, r)] for r in records], dtype=np.float64)
+        if X.shape[1] != len(self):
+            raise ValueError(f"Expected {len(self)} values per {self.disease} record, got {X.shape[1]}")
+        return X
+
+    # Matrix from a DataFrame of raw CSV strings (read with dtype=str). Each
+    # column is encoded in one vectorized pass; unknown codes and sentinels
+    # such as '?' become NaN.
+    def from_frame(self, frame):
+        import pandas as pd
+
+        X = np.empty((len(frame), len(self)), dtype=np.float64)
+        for i, column in enumerate(self.columns):
+            values = frame[column.name]
+            if column.codes and not pd.api.types.is_numeric_dtype(values):
+                coded = values.map(column.codes)
+                values = coded.where(coded.notna(), values)
+            X[:, i] = pd.to_numeric(values, errors='coerce')
+        return X
+
+    # Column-wise validation of a whole matrix: missing values, values outside
+    # the declared range and non-integers in integer columns. Returns the
+    # per-cell violation mask; rows are valid where no cell is flagged.
+    def violations(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            bad = np.isnan(X) | (X < self.low) | (X > self.high)
+            bad |= self.integer & (X != np.floor(X))
+        return bad
+
+    def errors(self, row):
+        bad = self.violations(np.asarray(row, dtype=np.float64).reshape(1, -1))[0]
+        return [f"{c.name} must be between {c.low} and {c.high}" for c, b in zip(self.columns, bad) if b]
+
+
+SCHEMAS = {
+    'heart_disease': Schema('heart_disease', [
+        Column('age', 'Age', 1, 120, 'int', default=50),
+        Column('sex', 'Sex', 0, 1, 'binary', SEX_MALE_1, default=0),
+        Column('cp', 'Chest Pain Type', 0, 3, 'int'),
+        Column('trestbps', 'Resting Blood Pressure (mm Hg)', 50, 250, 'int', default=120),
+        Column('chol', 'Serum Cholesterol (mg/dl)', 50, 700, 'int', default=200),
+        Column('fbs', 'Fasting Blood Sugar > 120 mg/dl', 0, 1, 'binary', YES_NO),
+        Column('restecg', 'Resting Electrocardiographic Results', 0, 2, 'int'),
+        Column('thalach', 'Maximum Heart Rate', 40, 250, 'int', default=150),
+        Column('exang', 'Exercise Induced Angina', 0, 1, 'binary', YES_NO),
+        Column('oldpeak', 'ST Depression', 0.0, 10.0, default=1.0, step=0.1),
+        Column('slope', 'Slope of Peak Exercise ST', 0, 2, 'int'),
+        Column('ca', 'Number of Major Vessels', 0, 4, 'int'),
+        Column('thal', 'Thalassemia', 0, 3, 'int'),
+    ], target='target'),
+    'diabetes': Schema('diabetes', [
+        Column('Pregnancies', 'Number of Pregnancies', 0, 20, 'int'),
+        Column('Glucose', 'Glucose Level (mg/dL)', 0, 300, default=100, step=1),
+        Column('BloodPressure', 'Blood Pressure (mm Hg)', 0, 200, default=70, step=1),
+        Column('SkinThickness', 'Skin Thickness (mm)', 0, 100, default=20, step=1),
+        Column('Insulin', 'Insulin Level (mu U/ml)', 0, 1000, default=100, step=1),
+        Column('BMI', 'BMI', 0.0, 80.0, default=25.0, step=0.1),
+        Column('DiabetesPedigreeFunction', 'Diabetes Pedigree Function', 0.0, 3.0, default=0.5, step=0.01),
+        Column('Age', 'Age', 1, 120, 'int', default=30),
+    ], target='Outcome'),
+    'parkinsons': Schema('parkinsons', [
+        Column('MDVP:Fo(Hz)', 'Average Vocal Fundamental Frequency (Hz)', 50.0, 300.0, default=148.8, step=0.1),
+        Column('MDVP:Fhi(Hz)', 'Maximum Vocal Fundamental Frequency (Hz)', 50.0, 600.0, default=175.8, step=0.1),
+        Column('MDVP:Flo(Hz)', 'Minimum Vocal Fundamental Frequency (Hz)', 50.0, 300.0, default=104.3, step=0.1),
+        Column('MDVP:Jitter(%)', 'Jitter (%)', 0.0, 0.05, default=0.0049, step=0.0001),
+        Column('MDVP:Jitter(Abs)', 'Absolute Jitter', 0.0, 0.0005, default=0.00003, step=0.000001),
+        Column('MDVP:RAP', 'Relative Amplitude Perturbation', 0.0, 0.03, default=0.0025, step=0.0001),
+        Column('MDVP:PPQ', 'Five-point Period Perturbation Quotient', 0.0, 0.03, default=0.0027, step=0.0001),
+        Column('Jitter:DDP', 'Average Absolute Difference of Differences between Cycles', 0.0, 0.1, default=0.0075, step=0.0001),
+        Column('MDVP:Shimmer', 'Shimmer', 0.0, 0.15, default=0.023, step=0.001),
+        Column('MDVP:Shimmer(dB)', 'Shimmer (dB)', 0.0, 1.5, default=0.221, step=0.001),
+        Column('Shimmer:APQ3', 'Three-point Amplitude Perturbation Quotient', 0.0, 0.1, default=0.013, step=0.001),
+        Column('Shimmer:APQ5', 'Five-point Amplitude Perturbation Quotient', 0.0, 0.1, default=0.013, step=0.001),
+        Column('MDVP:APQ', '11-point Amplitude Perturbation Quotient', 0.0, 0.15, default=0.018, step=0.001),
+        Column('Shimmer:DDA', 'Average Absolute Difference between Consecutive Amplitudes', 0.0, 0.2, default=0.038, step=0.001),
+        Column('NHR', 'Noise-to-Harmonics Ratio', 0.0, 0.35, default=0.012, step=0.001),
+        Column('HNR', 'Harmonics-to-Noise Ratio', 0.0, 40.0, default=22.1, step=0.1),
+        Column('RPDE', 'Recurrence Period Density Entropy', 0.0, 1.0, default=0.496, step=0.001),
+        Column('DFA', 'Detrended Fluctuation Analysis', 0.0, 1.0, default=0.722, step=0.001),
+        Column('spread1', 'Fundamental Frequency Variation (spread1)', -10.0, 0.0, default=-5.72, step=0.01),
+        Column('spread2', 'Fundamental Frequency Variation (spread2)', 0.0, 0.6, default=0.219, step=0.001),
+        Column('D2', 'Correlation Dimension', 0.0, 5.0, default=2.36, step=0.01),
+        Column('PPE', 'Pitch Period Entropy', 0.0, 1.0, default=0.194, step=0.001),
+    ], target='status', id_column='name'),
+    'lung_cancer': Schema('lung_cancer', [
+        Column('GENDER', 'Gender', 0, 1, 'binary', SEX_MALE_1),
+        Column('AGE', 'Age', 1, 120, 'int', default=40),
+        Column('SMOKING', 'Smoking', 1, 2, 'int', SURVEY),
+        Column('YELLOW_FINGERS', 'Yellow Fingers', 1, 2, 'int', SURVEY),
+        Column('ANXIETY', 'Anxiety', 1, 2, 'int', SURVEY),
+        Column('PEER_PRESSURE', 'Peer Pressure', 1, 2, 'int', SURVEY),
+        Column('CHRONIC DISEASE', 'Chronic Disease', 1, 2, 'int', SURVEY),
+        Column('FATIGUE ', 'Fatigue', 1, 2, 'int', SURVEY),
+        Column('ALLERGY ', 'Allergy', 1, 2, 'int', SURVEY),
+        Column('WHEEZING', 'Wheezing', 1, 2, 'int', SURVEY),
+        Column('ALCOHOL CONSUMING', 'Alcohol Consuming', 1, 2, 'int', SURVEY),
+        Column('COUGHING', 'Coughing', 1, 2, 'int', SURVEY),
+        Column('SHORTNESS OF BREATH', 'Shortness Of Breath', 1, 2, 'int', SURVEY),
+        Column('SWALLOWING DIFFICULTY', 'Swallowing Difficulty', 1, 2, 'int', SURVEY),
+        Column('CHEST PAIN', 'Chest Pain', 1, 2, 'int', SURVEY),
+    ], target='LUNG_CANCER', target_codes={'YES': 1, 'NO': 0}),
+    'thyroid': Schema('thyroid', [
+        Column('age', 'Age', 0, 120, 'int', default=40),
+        Column('sex', 'Sex', 0, 1, 'binary', SEX_FEMALE_1),
+        Column('on thyroxine', 'On Thyroxine', 0, 1, 'binary', TRUE_FALSE),
+        Column('TSH', 'TSH (mU/L)', 0.0, 600.0, default=1.4, step=0.1),
+        Column('T3 measured', 'T3 Measured', 0, 1, 'binary', TRUE_FALSE, default=1),
+        Column('T3', 'T3 (nmol/L)', 0.0, 15.0, default=2.0, step=0.1),
+        Column('TT4', 'TT4 (nmol/L)', 0.0, 500.0, default=103.0, step=1),
+    # N (coded 1) is the hypothyroid class: median TSH 12 against 1.2 for P
+    ], target='binaryClass', target_codes={'P': 0, 'N': 1}),
+}
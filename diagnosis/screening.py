@@ -0,0 +1,94 @@
+# Multi-disease screening: one patient record in, every applicable model
+# scored, one consolidated risk panel out. Fields the disease pages each ask
+# for separately (age, sex) are given once and mapped onto each schema's own
+# column and encoding. Everything else is given per disease under the
+# schema's column names, either in a section named after the disease or at
+# the top level:
+#
+#     {"age": 57, "sex": "Female",
+#      "heart_disease": {"cp": 0, "trestbps": 120, ...},
+#      "thyroid": {"on thyroxine": "f", "TSH": 1.3, "T3 measured": "t", "T3": 2.1, "TT4": 104}}
+#
+# A disease is scored only when all of its columns can be filled.
+from diagnosis import risk
+from diagnosis.schema import SCHEMAS
+
+# Shared patient field -> the column it feeds in each disease schema
+SHARED_FIELDS = {
+    'age': {'heart_disease': 'age', 'diabetes': 'Age', 'lung_cancer': 'AGE', 'thyroid': 'age'},
+    'sex': {'heart_disease': 'sex', 'lung_cancer': 'GENDER', 'thyroid': 'sex'},
+}
+
+# The schemas code sex in opposite directions (heart and lung: male = 1,
+# thyroid: female = 1), so a shared sex must be a label, never 0/1
+SEX_LABELS = {'Male', 'Female', 'M', 'F'}
+
+
+class ScreeningError(ValueError):
+    pass
+
+
+def disease_values(record, disease):
+    section = record.get(disease)
+    section = section if isinstance(section, dict) else {}
+    shared = {columns[disease]: record[field] for field, columns in SHARED_FIELDS.items()
+              if disease in columns and field in record}
+    values = {}
+    for name in SCHEMAS[disease].names:
+        if name in section:
+            values[name] = section[name]
+        elif name in shared:
+            values[name] = shared[name]
+        elif name in record and name not in SHARED_FIELDS:
+            values[name] = record[name]
+    return values
+
+
+# Feature rows for every disease the record covers. Returns
+# (rows, skipped, errors): rows maps disease -> validated feature row,
+# skipped maps disease -> missing columns, errors maps disease -> messages.
+def build_rows(record):
+    if not isinstance(record, dict):
+        raise ScreeningError("Expected a patient record object")
+    if 'sex' in record and record['sex'] not in SEX_LABELS:
+        raise ScreeningError(f"'sex' must be one of {', '.join(sorted(SEX_LABELS))}")
+
+    rows, skipped, errors = {}, {}, {}
+    for disease, schema in SCHEMAS.items():
+        values = disease_values(record, disease)
+        missing = [name for name in schema.names if name not in values]
+        if missing:
+            skipped[disease] = missing
+            continue
+        try:
+            row = schema.row(values)
+        except (TypeError, ValueError):
+            errors[disease] = ["Feature values must be numeric or a known code"]
+            continue
+        problems = schema.errors(row)
+        if problems:
+            errors[disease] = problems
+        else:
+            rows[disease] = row
+    return rows, skipped, errors
+
+
+# Consolidated panel from {disease: (prediction, score)}
+def risk_panel(rows, results, skipped=None, errors=None):
+    panel = {}
+    for disease, (prediction, value) in results.items():
+        detected = prediction == SCHEMAS[disease].positive_class
+        entry = {'prediction': prediction, 'score': value, 'detected': detected,
+                 'risk': 'High' if detected else 'Low'}
+        if disease == 'thyroid':
+            labs = [float(lab) for lab in risk.thyroid_labs(rows[disease])]
+            entry['lab_status'] = risk.lab_statuses(*labs)
+            entry['lab_risk'] = risk.lab_risk(*labs)
+            entry['risk'] = risk.overall_risk(prediction, entry['lab_risk'])
+        panel[disease] = entry
+    return {
+        'results': panel,
+        'detected': [d for d, entry in panel.items() if entry['detected']],
+        'skipped': skipped or {},
+        'errors': errors or {},
+    }
@@ -0,0 +1,375 @@
+# HTTP inference service for the diagnosis models, runnable without Streamlit:
+#
+#     uvicorn diagnosis.service:app --workers 4
+#
+# POST /predict/<disease> with {"features": [...]} (model column order) or
+# {"features": {"<column>": value, ...}}. Concurrent requests for the same
+# model are gathered into one matrix and scored with a single vectorized call.
+# POST /screen with {"patient": {...}} scores one patient against every model
+# the record covers, concurrently, and returns a combined risk panel (see
+# diagnosis.screening). GET /drift compares the inputs received so far with
+# the training data (see diagnosis.drift). Both POST routes accept an optional
+# "patient_id"; every result is stored (diagnosis.store) and a patient's
+# results are returned, newest first, by GET /history/<patient_id>[?disease=...].
+import asyncio
+import json
+import os
+import time
+import warnings
+from urllib.parse import parse_qs, unquote
+
+import numpy as np
+
+from diagnosis import drift, profiling, rollout, screening, store
+from diagnosis.cache import PredictionCache, row_key
+from diagnosis.models import LIVE, MODEL_FILES, ModelRegistry, score
+from diagnosis.schema import SCHEMAS
+
+# Time a batch stays open for more requests, and the largest batch scored at once
+BATCH_WINDOW_MS = float(os.environ.get('DIAGNOSIS_BATCH_WINDOW_MS', '2'))
+MAX_BATCH_SIZE = int(os.environ.get('DIAGNOSIS_MAX_BATCH_SIZE', '256'))
+# Warm all models in the background after startup instead of on first request
+PRELOAD = os.environ.get('DIAGNOSIS_PRELOAD', '1') not in ('0', 'false', 'no')
+# Score batches in this many worker processes (diagnosis.workers) instead of
+# threads of this one; 0 keeps scoring in-process
+WORKERS = int(os.environ.get('DIAGNOSIS_WORKERS', '0'))
+# Per-model prediction cache entries and lifetime; a size of 0 disables caching
+CACHE_SIZE = int(os.environ.get('DIAGNOSIS_CACHE_SIZE', '10000'))
+CACHE_TTL_SECONDS = float(os.environ.get('DIAGNOSIS_CACHE_TTL_SECONDS', '3600'))
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# Collects single-row requests for one model and flushes them as a batch when
+# the window closes or the batch is full. Scoring runs in the default executor
+# so the event loop keeps accepting requests while sklearn works, and is
+# handed to the worker pool's processes when one is given.
+class MicroBatcher:
+    def __init__(self, model, window_ms=BATCH_WINDOW_MS, max_batch_size=MAX_BATCH_SIZE, name='model', pool=None):
+        self.model = model
+        self.name = name
+        self.pool = pool
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, row):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.collect()
+            X = np.array([row for row, _ in batch], dtype=np.float64)
+            start = time.perf_counter()
+            try:
+                if self.pool is not None:
+                    predictions, scores = await loop.run_in_executor(None, self.pool.score, self.name, X)
+                else:
+                    predictions, scores = await loop.run_in_executor(None, score, self.model, X)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if profiling.ENABLED:
+                profiling.record(f"predict:{self.name}", time.perf_counter() - start)
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), prediction, value in zip(batch, predictions, scores):
+                if not future.done():
+                    future.set_result((int(prediction), float(value)))
+
+
+def parse_features(disease, payload):
+    schema = SCHEMAS[disease]
+    features = payload.get('features') if isinstance(payload, dict) else None
+    try:
+        if isinstance(features, dict):
+            row = schema.row(features)
+        elif isinstance(features, list) and len(features) == len(schema):
+            row = schema.from_records([features])[0]
+        else:
+            raise RequestError(422, f"Expected 'features' with {len(schema)} values for {disease}")
+    except KeyError as e:
+        raise RequestError(422, e.args[0])
+    except (TypeError, ValueError):
+        raise RequestError(422, "Feature values must be numeric or a known code")
+    errors = schema.errors(row)
+    if errors:
+        raise RequestError(422, '; '.join(errors))
+    return row.tolist()
+
+
+class InferenceService:
+    def __init__(self, window_ms=BATCH_WINDOW_MS, max_batch_size=MAX_BATCH_SIZE,
+                 registry=None, preload=PRELOAD, cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL_SECONDS,
+                 drift_monitor=None, workers=WORKERS, result_store=None):
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.registry = registry or ModelRegistry()
+        self.preload = preload
+        self.caches = {}
+        if cache_size > 0:
+            self.caches = {name: PredictionCache(cache_size, cache_ttl) for name in MODEL_FILES}
+        self.batchers = {}
+        self.batcher_lock = None
+        self.drift = drift_monitor if drift_monitor is not None else (drift.DriftMonitor() if drift.ENABLED else None)
+        self.drift_exporter = None
+        self.workers = workers
+        self.pool = None
+        self.store = result_store
+
+    async def startup(self):
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        self.batcher_lock = asyncio.Lock()
+        rollout.configure(self.registry)
+        if self.store is None and store.ENABLED:
+            self.store = store.ResultStore()
+        if self.workers > 0:
+            from diagnosis.workers import WorkerPool
+            loop = asyncio.get_running_loop()
+            self.pool = await loop.run_in_executor(None, WorkerPool, self.workers, self.registry.names)
+        if self.preload:
+            self.registry.preload()
+        if self.drift is not None:
+            if self.preload:
+                loop = asyncio.get_running_loop()
+                loop.run_in_executor(None, lambda: [self.drift.get_reference(d) for d in self.drift.diseases])
+            if drift.EXPORT_PATH:
+                self.drift_exporter = asyncio.create_task(self.export_drift(drift.EXPORT_PATH))
+
+    async def shutdown(self):
+        for batcher in self.batchers.values():
+            await batcher.stop()
+        if self.drift_exporter is not None:
+            self.drift_exporter.cancel()
+        if self.pool is not None:
+            self.pool.close()
+        if self.store is not None:
+            self.store.close()
+
+    # Rows are observed on the event loop thread, so its buffer is flushed
+    # here before each report is written
+    async def export_drift(self, path, seconds=drift.EXPORT_SECONDS):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(seconds)
+            self.drift.flush()
+            try:
+                await loop.run_in_executor(None, self.drift.export, path)
+            except Exception as e:
+                drift.logger.warning("Drift export to %s failed: %s", path, e)
+
+    def drift_report(self):
+        if self.drift is None:
+            raise RequestError(404, 'Drift monitoring is disabled')
+        self.drift.flush()
+        return self.drift.report()
+
+    # Models load on the first request for their endpoint (or sooner via
+    # preload). A canary version gets its own batcher, named <disease>@<version>.
+    async def get_batcher(self, disease, version=LIVE):
+        key = disease if version == LIVE else f"{disease}@{version}"
+        batcher = self.batchers.get(key)
+        if batcher is not None:
+            return batcher
+        async with self.batcher_lock:
+            if key not in self.batchers:
+                loop = asyncio.get_running_loop()
+                model = await loop.run_in_executor(None, self.registry.version_model, disease, version)
+                # Worker processes only hold the live models
+                pool = self.pool if version == LIVE else None
+                batcher = MicroBatcher(model, self.window_ms, self.max_batch_size, key, pool)
+                batcher.start()
+                self.batchers[key] = batcher
+        return self.batchers[key]
+
+    async def score_row(self, disease, row, patient_id=None, source=None):
+        start = time.perf_counter()
+        if self.drift is not None:
+            self.drift.observe(disease, row)
+        version = self.registry.route(disease, row)
+        cache = self.caches.get(disease)
+        key = row_key(row) if cache is not None else None
+        result = cache.get(key) if cache is not None else None
+        if result is None:
+            batcher = await self.get_batcher(disease, version)
+            result = await batcher.submit(row)
+            if cache is not None:
+                cache.put(key, result)
+        self.registry.shadow(disease, row, result, version)
+        if self.store is not None:
+            self.store.record(disease, row, result[0], result[1], patient_id,
+                              self.registry.version_label(disease, version),
+                              time.perf_counter() - start, source)
+        return result
+
+    async def predict(self, disease, payload):
+        if disease not in MODEL_FILES:
+            raise RequestError(404, f"Unknown disease '{disease}'")
+        row = parse_features(disease, payload)
+        prediction, value = await self.score_row(disease, row, payload.get('patient_id'), 'predict')
+        return {'disease': disease, 'prediction': prediction, 'score': value}
+
+    # Each applicable model's row goes to its own batcher at the same time,
+    # so the request waits for the slowest model rather than the sum
+    async def screen(self, payload):
+        record = payload.get('patient', payload) if isinstance(payload, dict) else payload
+        try:
+            rows, skipped, errors = screening.build_rows(record)
+        except screening.ScreeningError as e:
+            raise RequestError(422, str(e))
+        if not rows:
+            raise RequestError(422, "The record does not cover any disease model"
+                               + ('; ' + '; '.join(f"{d}: {', '.join(e)}" for d, e in errors.items())
+                                  if errors else ''))
+        # patient_id sits next to "patient" (as with /predict), or inside a bare record
+        patient_id = payload.get('patient_id', record.get('patient_id')) if isinstance(payload, dict) else None
+        diseases = list(rows)
+        results = await asyncio.gather(*(self.score_row(d, rows[d].tolist(), patient_id, 'screen')
+                                         for d in diseases))
+        return screening.risk_panel(rows, dict(zip(diseases, results)), skipped, errors)
+
+    def history(self, patient_id, query):
+        if self.store is None:
+            raise RequestError(404, 'Result storage is disabled')
+        disease = query.get('disease', [None])[0]
+        if disease is not None and disease not in MODEL_FILES:
+            raise RequestError(404, f"Unknown disease '{disease}'")
+        try:
+            limit = int(query.get('limit', [store.DEFAULT_LIMIT])[0])
+        except ValueError:
+            raise RequestError(422, "'limit' must be an integer")
+        return {'patient_id': patient_id, 'results': self.store.history(patient_id, disease, limit)}
+
+    def stats(self):
+        stats = self.registry.stats()
+        for name, b in self.batchers.items():
+            disease, _, version = name.partition('@')
+            entry = stats[disease]['canary'] if version else stats[disease]
+            entry.update({'batches': b.batches, 'rows': b.rows})
+        for name, cache in self.caches.items():
+            stats[name]['cache'] = cache.stats()
+        if self.pool is not None:
+            stats['workers'] = self.pool.stats()
+        if self.store is not None:
+            stats['store'] = self.store.stats()
+        return stats
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        method, path = scope['method'], scope['path'].rstrip('/')
+        try:
+            if method == 'GET' and path == '/health':
+                body = {'status': 'ok', 'models': self.registry.loaded()}
+            elif method == 'GET' and path == '/stats':
+                body = self.stats()
+            elif method == 'GET' and path.startswith('/history/'):
+                query = parse_qs(scope.get('query_string', b'').decode())
+                body = self.history(unquote(path[len('/history/'):]), query)
+            elif method == 'GET' and path == '/drift':
+                body = self.drift_report()
+            elif method == 'GET' and path == '/metrics':
+                await send_body(send, 200, profiling.metrics_text().encode(), b'text/plain; version=0.0.4')
+                return
+            elif method == 'POST' and path.startswith('/predict/'):
+                payload = await read_json(receive)
+                body = await self.predict(path[len('/predict/'):], payload)
+            elif method == 'POST' and path == '/screen':
+                payload = await read_json(receive)
+                body = await self.screen(payload)
+            else:
+                raise RequestError(404, 'Not found')
+            status = 200
+        except RequestError as e:
+            status, body = e.status, {'error': e.message}
+        except Exception as e:
+            status, body = 500, {'error': f"Prediction Error: {e}"}
+        await send_json(send, status, body)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def read_json(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(b''.join(chunks) or b'{}')
+    except ValueError:
+        raise RequestError(400, 'Request body must be JSON')
+
+
+async def send_json(send, status, body):
+    await send_body(send, status, json.dumps(body).encode(), b'application/json')
+
+
+async def send_body(send, status, data, content_type):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type),
+                    (b'content-length', str(len(data)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': data})
+
+
+app = InferenceService()
@@ -0,0 +1,171 @@
+# Persistent store of prediction results: every scored row with its inputs,
+# patient id, model version and latency, in an embedded SQLite database
+# (WAL mode, so history reads never wait for the writer).
+#
+# record() only puts the result on an in-memory queue and returns. One writer
+# thread drains the queue and inserts rows in batches, one transaction each,
+# so storage never adds to prediction latency. If the queue fills up (the
+# disk stalls), results are dropped and counted rather than blocking callers.
+# Indexes on (patient_id, disease, created_at), (disease, created_at) and
+# created_at keep a patient's history a single index range scan however
+# large the table grows.
+#
+#     DIAGNOSIS_STORE=0                      turn recording off
+#     DIAGNOSIS_RESULTS_DB=results.db        database path
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from diagnosis.models import BASE_DIR, LIVE
+from diagnosis.schema import SCHEMAS
+
+ENABLED = os.environ.get('DIAGNOSIS_STORE', '1') not in ('0', 'false', 'no', '')
+DB_PATH = os.environ.get('DIAGNOSIS_RESULTS_DB', os.path.join(BASE_DIR, 'results.db'))
+
+FLUSH_ROWS = 512
+FLUSH_SECONDS = 0.25
+MAX_QUEUE = 100_000
+DEFAULT_LIMIT = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    patient_id TEXT,
+    disease TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    prediction INTEGER,
+    score REAL,
+    latency_ms REAL,
+    source TEXT,
+    inputs TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_patient ON results (patient_id, disease, created_at);
+CREATE INDEX IF NOT EXISTS results_disease ON results (disease, created_at);
+CREATE INDEX IF NOT EXISTS results_created ON results (created_at);
+"""
+
+INSERT = """INSERT INTO results (created_at, patient_id, disease, model_version, prediction,
+                                 score, latency_ms, source, inputs)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+COLUMNS = ['id', 'created_at', 'patient_id', 'disease', 'model_version', 'prediction',
+           'score', 'latency_ms', 'source', 'inputs']
+
+
+def encode_inputs(disease, row):
+    return json.dumps(dict(zip(SCHEMAS[disease].names, map(float, row))))
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class ResultStore:
+    def __init__(self, path=DB_PATH, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS, max_queue=MAX_QUEUE):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self.queue = queue.Queue(max_queue)
+        self.local = threading.local()
+        self.written = 0
+        # Counted from request threads and the writer thread
+        self.dropped = 0
+        self.dropped_lock = threading.Lock()
+        self.batches = 0
+        self.writer = threading.Thread(target=self.run, name='result-store', daemon=True)
+        self.writer.start()
+
+    # row: the feature row in schema order; returns at once (the inputs are
+    # encoded on the writer thread)
+    def record(self, disease, row, prediction, score, patient_id=None, model_version=LIVE,
+               latency=None, source=None):
+        entry = (time.time(), None if patient_id in (None, '') else str(patient_id), disease,
+                 model_version, None if prediction is None else int(prediction),
+                 None if score is None else float(score),
+                 None if latency is None else latency * 1000.0, source, row)
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            with self.dropped_lock:
+                self.dropped += 1
+
+    def run(self):
+        conn = connect(self.path)
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                self.queue.task_done()
+                break
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_seconds
+            stop = False
+            while len(batch) < self.flush_rows:
+                try:
+                    entry = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            try:
+                rows = [entry[:-1] + (encode_inputs(entry[2], entry[-1]),) for entry in batch]
+                with conn:
+                    conn.executemany(INSERT, rows)
+                self.written += len(batch)
+                self.batches += 1
+            except sqlite3.Error:
+                with self.dropped_lock:
+                    self.dropped += len(batch)
+            for _ in range(len(batch) + stop):
+                self.queue.task_done()
+            if stop:
+                break
+        conn.close()
+
+    # Block until everything recorded so far is on disk
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+
+    # One read connection per thread
+    def reader(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = connect(self.path)
+        return conn
+
+    def query(self, where, params, limit):
+        sql = f"SELECT {', '.join(COLUMNS)} FROM results WHERE {where} ORDER BY created_at DESC LIMIT ?"
+        rows = self.reader().execute(sql, (*params, limit)).fetchall()
+        results = []
+        for row in rows:
+            result = dict(zip(COLUMNS, row))
+            result['inputs'] = json.loads(result['inputs'])
+            results.append(result)
+        return results
+
+    # A patient's results, newest first
+    def history(self, patient_id, disease=None, limit=DEFAULT_LIMIT):
+        if disease is None:
+            return self.query('patient_id = ?', (str(patient_id),), limit)
+        return self.query('patient_id = ? AND disease = ?', (str(patient_id), disease), limit)
+
+    def stats(self):
+        return {'path': self.path, 'queued': self.queue.qsize(), 'written': self.written,
+                'batches': self.batches, 'dropped': self.dropped}
@@ -0,0 +1,100 @@
+# Fast inference for the SVC models (diabetes, Parkinson's). SVC.predict
+# evaluates the kernel against every support vector one row at a time inside
+# libsvm. For a linear kernel the whole model collapses to one weight vector
+# (w = dual_coef_ @ support_vectors_), which we score with LinearScorer. For
+# other kernels we keep a contiguous support-vector matrix with precomputed
+# squared norms and evaluate the kernel for a whole batch with one matmul.
+import numpy as np
+
+from diagnosis.linear import LinearScorer
+
+SVC_MODELS = ['diabetes', 'parkinsons']
+
+# Rows per kernel block, bounding the (rows x n_support) intermediate matrix
+DEFAULT_BLOCK_ROWS = 4096
+
+
+class KernelSVCScorer:
+    def __init__(self, support_vectors, dual_coef, intercept, classes, kernel, gamma,
+                 coef0=0.0, degree=3, dtype=np.float64, feature_names=None, sv_sq_norms=None):
+        self.dtype = np.dtype(dtype)
+        self.support_vectors_ = np.ascontiguousarray(support_vectors, dtype=self.dtype)
+        self.dual_coef_ = np.ascontiguousarray(dual_coef, dtype=self.dtype).reshape(1, -1)
+        self.intercept_ = np.asarray(intercept, dtype=np.float64).reshape(1)
+        self.classes_ = np.asarray(classes)
+        self.kernel = str(kernel)
+        self.gamma = float(gamma)
+        self.coef0 = float(coef0)
+        self.degree = int(degree)
+        self.n_features_in_ = self.support_vectors_.shape[1]
+        if sv_sq_norms is None:
+            sv_sq_norms = np.einsum('ij,ij->i', self.support_vectors_, self.support_vectors_)
+        self.sv_sq_norms = np.asarray(sv_sq_norms, dtype=self.dtype)
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    @classmethod
+    def from_estimator(cls, model, dtype=np.float64):
+        return cls(model.support_vectors_, model.dual_coef_, model.intercept_, model.classes_,
+                   model.kernel, model._gamma, model.coef0, model.degree, dtype,
+                   getattr(model, 'feature_names_in_', None))
+
+    @classmethod
+    def from_artifact(cls, header, arrays):
+        params = header['params']
+        return cls(arrays['support_vectors'], arrays['dual_coef'], arrays['intercept'], header['classes'],
+                   params['kernel'], params['gamma'], params['coef0'], params['degree'],
+                   arrays['support_vectors'].dtype, header['feature_names'], arrays['sv_sq_norms'])
+
+    def to_artifact(self):
+        arrays = {'support_vectors': self.support_vectors_, 'dual_coef': self.dual_coef_,
+                  'intercept': self.intercept_, 'sv_sq_norms': self.sv_sq_norms}
+        params = {'kernel': self.kernel, 'gamma': self.gamma, 'coef0': self.coef0, 'degree': self.degree}
+        return 'svc', arrays, params
+
+    def kernel_block(self, X):
+        K = X @ self.support_vectors_.T
+        if self.kernel == 'rbf':
+            # ||x - sv||^2 = ||x||^2 + ||sv||^2 - 2 x.sv, clipped against rounding below zero
+            sq_norms = np.einsum('ij,ij->i', X, X)
+            K *= -2.0
+            K += sq_norms[:, None]
+            K += self.sv_sq_norms[None, :]
+            np.maximum(K, 0.0, out=K)
+            K *= -self.gamma
+            np.exp(K, out=K)
+        elif self.kernel == 'poly':
+            K *= self.gamma
+            K += self.coef0
+            K **= self.degree
+        elif self.kernel == 'sigmoid':
+            K *= self.gamma
+            K += self.coef0
+            np.tanh(K, out=K)
+        elif self.kernel != 'linear':
+            raise ValueError(f"Unsupported SVC kernel '{self.kernel}'")
+        return K
+
+    def decision_function(self, X, block_rows=DEFAULT_BLOCK_ROWS):
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), block_rows):
+            K = self.kernel_block(X[start:start + block_rows])
+            out[start:start + block_rows] = (K @ self.dual_coef_.T).ravel()
+        return out + self.intercept_
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+
+# Compile a fitted binary SVC into the fastest equivalent scorer
+def compile_svc(model, dtype=np.float64):
+    if len(model.classes_) != 2:
+        raise ValueError("Only binary SVC models can be compiled")
+    if model.kernel == 'linear':
+        coef = model.dual_coef_ @ model.support_vectors_
+        return LinearScorer(coef, model.intercept_, model.classes_,
+                            getattr(model, 'feature_names_in_', None), probability=False)
+    return KernelSVCScorer.from_estimator(model, dtype)
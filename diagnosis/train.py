@@ -0,0 +1,183 @@
+# Scripted training for the five disease models, replacing the Colab
+# notebooks. Each model is fitted the way its notebook did it (same
+# estimator, split and random_state) from the CSVs in Datasets/, the models
+# train in parallel worker processes, and every run writes a versioned
+# artifact with its metrics:
+#
+#     Models/versions/<disease>/<version>/model.sav
+#     Models/versions/<disease>/<version>/metrics.json
+#
+#     python -m diagnosis.train                    # all five, one process each
+#     python -m diagnosis.train thyroid --install  # also replace Models/Thyroid_model.sav
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from diagnosis.datasets import checksums, dataset_path, load_dataset, parse
+from diagnosis.models import DATASET_FILES, MODEL_FILES, VERSIONS_DIR, model_path, version_path
+from diagnosis.schema import SCHEMAS
+
+# Estimator and split for each disease, as in the training notebooks
+TRAINING_CONFIGS = {
+    'heart_disease': {'estimator': 'logistic_regression', 'params': {},
+                      'test_size': 0.2, 'stratify': True, 'random_state': 2},
+    'diabetes': {'estimator': 'svc', 'params': {'kernel': 'linear'},
+                 'test_size': 0.2, 'stratify': True, 'random_state': 2},
+    'parkinsons': {'estimator': 'svc', 'params': {'kernel': 'linear'},
+                   'test_size': 0.2, 'stratify': False, 'random_state': 2},
+    'lung_cancer': {'estimator': 'logistic_regression', 'params': {},
+                    'test_size': 0.2, 'stratify': True, 'random_state': 2},
+    'thyroid': {'estimator': 'logistic_regression', 'params': {},
+                'test_size': 0.2, 'stratify': False, 'random_state': 42},
+}
+
+
+# The thyroid notebook mean-imputes missing lab values ('?') instead of
+# dropping rows; the other datasets have no gaps. Returns the imputed matrix
+# and the means used, so the same fill can be applied to held-out rows.
+def impute_means(X, means=None):
+    if means is None:
+        means = np.nanmean(X, axis=0) if np.isnan(X).any() else np.zeros(X.shape[1])
+    if not np.isnan(X).any():
+        return X, means
+    return np.where(np.isnan(X), means, X), means
+
+
+# Parsed (X, y) for a disease, before imputation, from the columnar dataset
+# cache (or straight from the CSV with use_cache=False)
+def load_training_data(disease, use_cache=True):
+    if use_cache:
+        X, y, meta = load_dataset(disease)
+        return X, y, meta['sha256']
+    path = dataset_path(disease)
+    X, y = parse(disease, path)
+    return X, y, checksums(path)[0]
+
+
+def make_estimator(name, params):
+    if name == 'logistic_regression':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(**params)
+    if name == 'svc':
+        from sklearn.svm import SVC
+        return SVC(**params)
+    raise ValueError(f"Unknown estimator '{name}'")
+
+
+def split(X, y, config):
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(X, y, test_size=config['test_size'], random_state=config['random_state'],
+                            stratify=y if config['stratify'] else None)
+
+
+def evaluate(model, X, y):
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+
+    predictions = model.predict(X)
+    scores = model.decision_function(X)
+    return {
+        'accuracy': float(accuracy_score(y, predictions)),
+        'precision': float(precision_score(y, predictions, zero_division=0)),
+        'recall': float(recall_score(y, predictions, zero_division=0)),
+        'f1': float(f1_score(y, predictions, zero_division=0)),
+        'roc_auc': float(roc_auc_score(y, scores)) if len(np.unique(y)) > 1 else None,
+    }
+
+
+def train_model(disease, version, use_cache=True, config=None):
+    import sklearn
+
+    warnings.filterwarnings('ignore')
+    config = config or TRAINING_CONFIGS[disease]
+    X, y, checksum = load_training_data(disease, use_cache)
+    X, _ = impute_means(X)
+    X_train, X_test, y_train, y_test = split(X, y, config)
+
+    model = make_estimator(config['estimator'], config['params'])
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    out_dir = version_path(disease, version)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'model.sav'), 'wb') as f:
+        pickle.dump(model, f)
+
+    metrics = {
+        'disease': disease,
+        'version': version,
+        'estimator': config['estimator'],
+        'params': config['params'],
+        'split': {k: config[k] for k in ('test_size', 'stratify', 'random_state')},
+        'dataset': DATASET_FILES[disease],
+        'dataset_sha256': checksum,
+        'n_train': int(len(y_train)),
+        'n_test': int(len(y_test)),
+        'features': SCHEMAS[disease].names,
+        'fit_seconds': fit_seconds,
+        'train': evaluate(model, X_train, y_train),
+        'test': evaluate(model, X_test, y_test),
+        'sklearn_version': sklearn.__version__,
+    }
+    with open(os.path.join(out_dir, 'metrics.json'), 'w') as f:
+        json.dump(metrics, f, indent=2)
+    return metrics
+
+
+# Make a trained version the live model: copy it over Models/<file>.sav and
+# rebuild the compiled artifact the app loads in preference to it
+def install(disease, version):
+    from diagnosis.artifacts import convert
+
+    shutil.copyfile(os.path.join(version_path(disease, version), 'model.sav'), model_path(disease))
+    convert(disease)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the disease models from Datasets/.')
+    parser.add_argument('diseases', nargs='*', help=f"default: {' '.join(MODEL_FILES)}")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--version', default=time.strftime('%Y%m%d-%H%M%S'))
+    parser.add_argument('--no-cache', action='store_true', help='re-parse the CSVs')
+    parser.add_argument('--tuned', action='store_true',
+                        help='use the winning configs in Models/tuning/ (python -m diagnosis.tune)')
+    parser.add_argument('--install', action='store_true',
+                        help='replace the live Models/*.sav (and artifacts) with the new versions')
+    args = parser.parse_args(argv)
+    diseases = args.diseases or list(MODEL_FILES)
+    unknown = set(diseases) - set(MODEL_FILES)
+    if unknown:
+        parser.error(f"unknown disease: {', '.join(sorted(unknown))}")
+
+    configs = {d: None for d in diseases}
+    if args.tuned:
+        from diagnosis.tune import load_tuned_config
+        configs = {d: load_tuned_config(d) for d in diseases}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(diseases)))) as pool:
+        futures = {d: pool.submit(train_model, d, args.version, not args.no_cache, configs[d])
+                   for d in diseases}
+        results = {d: f.result() for d, f in futures.items()}
+
+    for disease, metrics in results.items():
+        print(f"{disease:<14} test accuracy {metrics['test']['accuracy']:.3f}  "
+              f"train accuracy {metrics['train']['accuracy']:.3f}  fit {metrics['fit_seconds']:.2f}s")
+        if args.install:
+            install(disease, args.version)
+    print(f"Trained {len(results)} models as version {args.version} "
+          f"in {time.perf_counter() - start:.1f}s -> {VERSIONS_DIR}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# Hyperparameter search for the disease models. Every candidate is scored by
+# stratified k-fold cross-validation on the training split train.py uses, in
+# a process pool, and is costed by fit time and by the single-row and batch
+# latency of the compiled scorer the app actually serves. The winner is the
+# most accurate candidate inside the latency budget (ties go to the cheaper
+# one) and is written with the leaderboard to Models/tuning/<disease>.json,
+# which `python -m diagnosis.train --tuned` picks up.
+#
+#     python -m diagnosis.tune                               # grid search, all models
+#     python -m diagnosis.tune thyroid --strategy halving --max-predict-us 50
+import argparse
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+
+from diagnosis.artifacts import compile_estimator
+from diagnosis.models import MODEL_FILES, MODELS_DIR
+from diagnosis.train import TRAINING_CONFIGS, impute_means, load_training_data, make_estimator, split
+
+TUNING_DIR = os.path.join(MODELS_DIR, 'tuning')
+
+DEFAULT_FOLDS = 5
+BATCH_ROWS = 10_000
+
+# Candidate grids per estimator family
+SEARCH_SPACES = {
+    'logistic_regression': [
+        {'C': C, 'class_weight': class_weight, 'max_iter': 1000}
+        for C, class_weight in product([0.01, 0.1, 1.0, 10.0, 100.0], [None, 'balanced'])
+    ],
+    'svc': [
+        {'kernel': 'linear', 'C': C} for C in [0.1, 1.0]
+    ] + [
+        {'kernel': 'rbf', 'C': C, 'gamma': gamma}
+        for C, gamma in product([1.0, 10.0, 100.0], ['scale', 1e-3, 1e-4])
+    ],
+}
+
+
+def tuning_path(disease):
+    return os.path.join(TUNING_DIR, f"{disease}.json")
+
+
+def load_tuned_config(disease):
+    with open(tuning_path(disease)) as f:
+        return json.load(f)['config']
+
+
+# Fold splits and per-fold fitted transforms are memoized per worker process,
+# so each is computed once however many candidates a worker evaluates.
+@lru_cache(maxsize=None)
+def training_split(disease):
+    X, y, _ = load_training_data(disease)
+    X_train, _, y_train, _ = split(X, y, TRAINING_CONFIGS[disease])
+    return X_train, y_train
+
+
+@lru_cache(maxsize=None)
+def fold_indices(disease, n_folds, seed):
+    from sklearn.model_selection import StratifiedKFold
+
+    X, y = training_split(disease)
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    return tuple(folds.split(X, y))
+
+
+@lru_cache(maxsize=None)
+def fold_data(disease, n_folds, seed, fold):
+    X, y = training_split(disease)
+    train_idx, test_idx = fold_indices(disease, n_folds, seed)[fold]
+    # Imputation means are fitted on the training fold only
+    X_fit, means = impute_means(X[train_idx])
+    X_eval, _ = impute_means(X[test_idx], means)
+    return X_fit, y[train_idx], X_eval, y[test_idx]
+
+
+def predict_cost(scorer, X, repeats=200):
+    row = np.ascontiguousarray(X[:1])
+    scorer.decision_function(row)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scorer.decision_function(row)
+        timings.append(time.perf_counter() - start)
+    batch = np.resize(X, (BATCH_ROWS, X.shape[1]))
+    start = time.perf_counter()
+    scorer.decision_function(batch)
+    batch_seconds = time.perf_counter() - start
+    return {'predict_us_p50': float(np.median(timings) * 1e6),
+            'predict_us_p95': float(np.percentile(timings, 95) * 1e6),
+            'rows_per_second': BATCH_ROWS / batch_seconds if batch_seconds else float('inf')}
+
+
+# Cross-validate one candidate; fraction < 1 trains each fold on a stratified
+# subsample (the successive-halving resource)
+def evaluate_candidate(disease, estimator, params, n_folds=DEFAULT_FOLDS, seed=0, fraction=1.0):
+    warnings.filterwarnings('ignore')
+    accuracies, fit_seconds = [], []
+    model = None
+    for fold in range(n_folds):
+        X_fit, y_fit, X_eval, y_eval = fold_data(disease, n_folds, seed, fold)
+        if fraction < 1.0:
+            from sklearn.model_selection import train_test_split
+
+            size = max(int(len(y_fit) * fraction), 20)
+            X_fit, _, y_fit, _ = train_test_split(X_fit, y_fit, train_size=size,
+                                                  random_state=seed + fold, stratify=y_fit)
+        model = make_estimator(estimator, params)
+        start = time.perf_counter()
+        model.fit(X_fit, y_fit)
+        fit_seconds.append(time.perf_counter() - start)
+        accuracies.append(float((model.predict(X_eval) == y_eval).mean()))
+    result = {'estimator': estimator, 'params': params, 'fraction': fraction,
+              'cv_accuracy': float(np.mean(accuracies)), 'cv_accuracy_std': float(np.std(accuracies)),
+              'fit_seconds': float(np.mean(fit_seconds))}
+    result.update(predict_cost(compile_estimator(model), X_eval))
+    return result
+
+
+def run_round(pool, disease, candidates, n_folds, seed, fraction):
+    futures = [pool.submit(evaluate_candidate, disease, estimator, params, n_folds, seed, fraction)
+               for estimator, params in candidates]
+    return [f.result() for f in futures]
+
+
+def rank(results, max_predict_us=None):
+    within = [r for r in results if max_predict_us is None or r['predict_us_p50'] <= max_predict_us]
+    return sorted(within, key=lambda r: (-r['cv_accuracy'], r['predict_us_p50'], r['fit_seconds']))
+
+
+def search(pool, disease, strategy='grid', n_folds=DEFAULT_FOLDS, seed=0, max_predict_us=None, factor=3):
+    estimator = TRAINING_CONFIGS[disease]['estimator']
+    candidates = [(estimator, params) for params in SEARCH_SPACES[estimator]]
+    if strategy == 'grid':
+        return run_round(pool, disease, candidates, n_folds, seed, 1.0)
+
+    # Successive halving: score everyone on a small share of the rows, keep
+    # the best 1/factor, and grow the share until it reaches the full set
+    rounds = max(1, int(np.ceil(np.log(len(candidates)) / np.log(factor))))
+    for i in range(rounds + 1):
+        # A single survivor goes straight to the full set
+        fraction = 1.0 if len(candidates) == 1 else min(1.0, factor ** (i - rounds))
+        results = run_round(pool, disease, candidates, n_folds, seed, fraction)
+        if fraction >= 1.0:
+            return results
+        ranked = rank(results, max_predict_us) or rank(results)
+        keep = max(1, len(ranked) // factor)
+        candidates = [(r['estimator'], r['params']) for r in ranked[:keep]]
+    return results
+
+
+def write_result(disease, results, strategy, n_folds, max_predict_us):
+    ranked = rank(results, max_predict_us)
+    if not ranked:
+        raise ValueError(f"No {disease} candidate meets the {max_predict_us}us latency budget")
+    best = ranked[0]
+    base = TRAINING_CONFIGS[disease]
+    config = dict(base, estimator=best['estimator'], params=best['params'])
+    report = {'disease': disease, 'strategy': strategy, 'folds': n_folds,
+              'max_predict_us': max_predict_us, 'config': config, 'benchmark': best,
+              'leaderboard': rank(results)}
+    os.makedirs(TUNING_DIR, exist_ok=True)
+    with open(tuning_path(disease), 'w') as f:
+        json.dump(report, f, indent=2)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tune the disease models by cross-validated search.')
+    parser.add_argument('diseases', nargs='*', help=f"default: {' '.join(MODEL_FILES)}")
+    parser.add_argument('--strategy', choices=['grid', 'halving'], default='grid')
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-predict-us', type=float,
+                        help='latency budget: median single-row predict time of the compiled scorer')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+    diseases = args.diseases or list(MODEL_FILES)
+    unknown = set(diseases) - set(MODEL_FILES)
+    if unknown:
+        parser.error(f"unknown disease: {', '.join(sorted(unknown))}")
+
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        for disease in diseases:
+            start = time.perf_counter()
+            results = search(pool, disease, args.strategy, args.folds, args.seed, args.max_predict_us)
+            best = write_result(disease, results, args.strategy, args.folds, args.max_predict_us)
+            print(f"{disease:<14} {best['estimator']} {best['params']}  "
+                  f"cv accuracy {best['cv_accuracy']:.3f}  fit {best['fit_seconds'] * 1000:.1f}ms  "
+                  f"predict {best['predict_us_p50']:.1f}us  ({len(results)} candidates, "
+                  f"{time.perf_counter() - start:.1f}s) -> {tuning_path(disease)}")
+
+
+if __name__ == '__main__':
+    main()
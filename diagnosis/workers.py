@@ -0,0 +1,180 @@
+# Multiprocess inference: N worker processes, each keeping every model it is
+# asked for resident (compiled artifacts are memory-mapped, so the workers
+# share one copy of the weights through the page cache). Feature batches are
+# never pickled: each worker owns a pair of multiprocessing.shared_memory
+# blocks, the caller writes the rows into the input block, sends a tiny
+# (model, rows, columns) message over a pipe, and reads predictions and scores
+# back out of the output block.
+#
+# Every worker can score every model, so work is dispatched from one queue of
+# idle workers rather than per-model queues that could leave cores idle while
+# another model is busy. Large matrices are split across all idle workers.
+#
+#     pool = WorkerPool(4)
+#     predictions, scores = pool.score('thyroid', X)
+#     pool.close()
+import multiprocessing
+import os
+import queue
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from diagnosis.models import MODEL_FILES
+from diagnosis.schema import SCHEMAS
+
+# Rows one worker scores per round trip (sets the shared buffer size)
+SLOT_ROWS = 65_536
+# Matrices smaller than this go to a single worker
+MIN_SPLIT_ROWS = 4096
+
+
+# Runs in the worker process
+def worker_main(conn, input_name, output_name, names):
+    from diagnosis.models import ModelRegistry, score
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    # Workers share the parent's resource tracker, so attaching here does not
+    # make the blocks outlive (or vanish before) the pool
+    shm_in = shared_memory.SharedMemory(name=input_name)
+    shm_out = shared_memory.SharedMemory(name=output_name)
+    registry = ModelRegistry(names)
+    registry.preload(background=False)
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            name, rows, columns = message
+            try:
+                X = np.ndarray((rows, columns), dtype=np.float64, buffer=shm_in.buf)
+                out = np.ndarray((rows, 2), dtype=np.float64, buffer=shm_out.buf)
+                predictions, scores = score(registry[name], X)
+                out[:, 0] = predictions
+                out[:, 1] = scores
+                del X, out
+                conn.send(None)
+            except Exception as e:
+                conn.send(RuntimeError(f"{name}: {e}"))
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+class Worker:
+    def __init__(self, context, names, slot_rows, columns):
+        self.context = context
+        self.names = names
+        self.input = shared_memory.SharedMemory(create=True, size=slot_rows * columns * 8)
+        self.output = shared_memory.SharedMemory(create=True, size=slot_rows * 2 * 8)
+        self.start()
+
+    def start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=worker_main, name='inference-worker', daemon=True,
+                                            args=(child_conn, self.input.name, self.output.name, self.names))
+        self.process.start()
+        child_conn.close()
+
+    def run(self, name, X):
+        rows, columns = X.shape
+        np.ndarray(X.shape, dtype=np.float64, buffer=self.input.buf)[:] = X
+        self.conn.send((name, rows, columns))
+        error = self.conn.recv()
+        if error is not None:
+            raise error
+        out = np.ndarray((rows, 2), dtype=np.float64, buffer=self.output.buf)
+        return out[:, 0].astype(np.int64), out[:, 1].copy()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+        self.input.close()
+        self.input.unlink()
+        self.output.close()
+        self.output.unlink()
+
+
+class WorkerPool:
+    # 'spawn' by default: forking a process that already runs threads (the
+    # Streamlit server, the service's executors) is not safe
+    def __init__(self, workers=None, names=None, slot_rows=SLOT_ROWS, context='spawn'):
+        self.names = list(names or MODEL_FILES)
+        self.slot_rows = slot_rows
+        self.columns = max(len(SCHEMAS[name]) for name in self.names)
+        context = multiprocessing.get_context(context)
+        self.workers = [Worker(context, self.names, slot_rows, self.columns)
+                        for _ in range(workers or os.cpu_count() or 1)]
+        self.idle = queue.Queue()
+        for worker in self.workers:
+            self.idle.put(worker)
+        self.executor = ThreadPoolExecutor(len(self.workers), thread_name_prefix='inference-dispatch')
+        self.lock = threading.Lock()
+        self.rows = 0
+        self.calls = 0
+        self.restarts = 0
+
+    def __len__(self):
+        return len(self.workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Score one chunk (at most slot_rows rows) on the next idle worker
+    def run_chunk(self, name, X):
+        worker = self.idle.get()
+        try:
+            return worker.run(name, X)
+        except (EOFError, OSError):
+            # The worker died (e.g. killed for memory); replace it and retry once
+            with self.lock:
+                self.restarts += 1
+            worker.process.join(timeout=1)
+            worker.conn.close()
+            worker.start()
+            return worker.run(name, X)
+        finally:
+            self.idle.put(worker)
+
+    # Same return values as diagnosis.models.score
+    def score(self, name, X):
+        if name not in self.names:
+            raise KeyError(name)
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        with self.lock:
+            self.calls += 1
+            self.rows += len(X)
+        if len(X) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        chunk = self.slot_rows
+        if len(X) >= MIN_SPLIT_ROWS:
+            chunk = min(chunk, -(-len(X) // len(self.workers)))
+        if len(X) <= chunk:
+            return self.run_chunk(name, X)
+        parts = list(self.executor.map(lambda start: self.run_chunk(name, X[start:start + chunk]),
+                                       range(0, len(X), chunk)))
+        return np.concatenate([p for p, _ in parts]), np.concatenate([s for _, s in parts])
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def stats(self):
+        return {'workers': len(self.workers), 'calls': self.calls, 'rows': self.rows,
+                'restarts': self.restarts}
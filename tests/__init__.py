@@ -0,0 +1,2 @@
+# Checks for the models, their artifacts, the clinical rule tables and the
+# bulk paths; run with python -m pytest tests
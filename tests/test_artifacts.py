@@ -0,0 +1,31 @@
+# Every compiled artifact in Models/ scores the training rows exactly as its
+# pickled estimator does, and was built from the .sav that is installed.
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from diagnosis.artifacts import file_sha256, read_header
+from diagnosis.batch import read_features
+from diagnosis.models import MODEL_FILES, compiled_path, load_model, load_pickled_model, model_path, score
+
+
+@pytest.mark.parametrize('name', list(MODEL_FILES))
+def test_compiled_model_matches_pickle(name):
+    warnings.filterwarnings('ignore')
+    X = read_features(name)
+    predictions, scores = score(load_model(name), X)
+    expected_predictions, expected_scores = score(load_pickled_model(name), X)
+    assert (predictions == expected_predictions).all()
+    # Equal up to rounding: compiled SVCs sum the kernel expansion in another order
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-6, atol=1e-7)
+
+
+@pytest.mark.parametrize('name', list(MODEL_FILES))
+def test_artifact_checksums(name):
+    path = compiled_path(name)
+    header = read_header(path)
+    assert header['source']['sha256'] == file_sha256(model_path(name))
+    for spec in header['arrays'].values():
+        assert file_sha256(os.path.join(path, spec['file'])) == spec['sha256']
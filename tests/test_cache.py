@@ -0,0 +1,31 @@
+# PredictionCache evicts the least recently used entry when full and treats
+# entries older than the TTL as misses.
+from types import SimpleNamespace
+
+from diagnosis import cache
+from diagnosis.cache import PredictionCache, row_key
+
+
+def test_lru_eviction():
+    predictions = PredictionCache(maxsize=2, ttl=None)
+    predictions.put(row_key([1]), (0, 0.1))
+    predictions.put(row_key([2]), (1, 0.9))
+    assert predictions.get(row_key([1])) == (0, 0.1)    # [2] is now least recently used
+    predictions.put(row_key([3]), (1, 0.8))
+    assert predictions.get(row_key([2])) is None
+    assert predictions.get(row_key([1])) == (0, 0.1)
+    assert predictions.get(row_key([3])) == (1, 0.8)
+    assert len(predictions) == 2
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(cache, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    predictions = PredictionCache(maxsize=10, ttl=60.0)
+    predictions.put(row_key([1.0]), (1, 0.7))
+    clock.now += 59.0
+    assert predictions.get(row_key([1])) == (1, 0.7)
+    clock.now += 2.0
+    assert predictions.get(row_key([1])) is None
+    assert len(predictions) == 0
+    assert (predictions.hits, predictions.misses) == (1, 1)
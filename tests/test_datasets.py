@@ -0,0 +1,16 @@
+# The dataset cache is keyed by the schema's encoding as well as the CSV:
+# recoding the target rebuilds it instead of serving stale labels.
+from diagnosis import datasets
+from diagnosis.schema import SCHEMAS
+
+
+def test_schema_change_rebuilds_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'CACHE_DIR', str(tmp_path))
+    assert datasets.refresh('thyroid') == 'rebuilt'
+    assert datasets.refresh('thyroid') == 'cached'
+    _, y = datasets.read_cache('thyroid', mmap=False)
+
+    monkeypatch.setattr(SCHEMAS['thyroid'], 'target_codes', {'P': 1, 'N': 0})
+    assert datasets.refresh('thyroid') == 'rebuilt'
+    _, recoded = datasets.read_cache('thyroid', mmap=False)
+    assert (recoded == 1 - y).all()
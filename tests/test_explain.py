@@ -0,0 +1,18 @@
+# Explanation signs follow the schema's positive class: inputs that point to
+# the disease raise risk.
+import warnings
+
+import numpy as np
+
+from diagnosis import features
+from diagnosis.explain import Explainers
+from diagnosis.models import load_model
+from diagnosis.schema import SCHEMAS
+
+
+def test_high_tsh_raises_thyroid_risk():
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    row = features.thyroid_features(50, 'Female', 'No', 40.0, 'Yes', 1.0, 4.0)
+    explainer = Explainers().get('thyroid', load_model('thyroid'))
+    contributions = explainer.contributions(np.asarray(row).reshape(1, -1))[0]
+    assert contributions[SCHEMAS['thyroid'].index['TSH']] > 0
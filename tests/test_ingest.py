@@ -0,0 +1,19 @@
+# Bulk ingest of the raw thyroid export: the lab rules see the form's units,
+# so euthyroid (P) patients of the training data mostly come out Low risk.
+import warnings
+
+import pandas as pd
+
+from diagnosis.datasets import dataset_path
+from diagnosis.ingest import read_chunks, score_chunk
+from diagnosis.models import load_model
+
+
+def test_euthyroid_rows_score_low():
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    model = load_model('thyroid')
+    path = dataset_path('thyroid')
+    scored = pd.concat(score_chunk(chunk, model) for chunk in read_chunks(path))
+    target = pd.read_csv(path, usecols=['binaryClass'])['binaryClass']
+    euthyroid = scored.loc[target.to_numpy() == 'P']
+    assert (euthyroid['overall_risk'] == 'Low').mean() > 0.95
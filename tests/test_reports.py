@@ -0,0 +1,22 @@
+# Bulk reports word the prediction by the schema's positive class: a
+# hypothyroid (N) row of the raw export is reported as dysfunction.
+import warnings
+
+from diagnosis.reports import reports_for_csv
+
+HEADER = ('"age","sex","on thyroxine","query on thyroxine","on antithyroid medication","sick","pregnant",'
+          '"thyroid surgery","I131 treatment","query hypothyroid","query hyperthyroid","lithium","goitre",'
+          '"tumor","hypopituitary","psych","TSH measured","TSH","T3 measured","T3","TT4 measured","TT4",'
+          '"T4U measured","T4U","FTI measured","FTI","TBG measured","TBG","referral source","binaryClass"')
+# Rows from Datasets/hypothyroid.csv: one euthyroid (P), one hypothyroid (N)
+EUTHYROID = '41,F,f,f,f,f,f,f,f,f,f,f,f,f,f,f,t,1.3,t,2.5,t,125,t,1.14,t,109,f,?,SVHC,P'
+HYPOTHYROID = '44,M,f,f,f,f,f,f,f,f,f,f,f,f,f,f,t,45,t,1.4,t,39,t,1.16,t,33,f,?,SVI,N'
+
+
+def test_thyroid_reports_label_by_positive_class(tmp_path):
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    path = tmp_path / 'labs.csv'
+    path.write_text('\n'.join([HEADER, EUTHYROID, HYPOTHYROID]) + '\n')
+    reports = [report for _, report in reports_for_csv('thyroid', path)]
+    predictions = [dict(report.results)['Prediction'] for report in reports]
+    assert predictions == ["Thyroid Dysfunction Not Indicated", "Thyroid Dysfunction Indicated"]
@@ -0,0 +1,70 @@
+# The thyroid rule tables (diagnosis.risk) against the hand-written rules they
+# replaced, at every threshold boundary. The reference below is the original
+# per-patient logic, keyed on the hypothyroid class: reordering
+# OVERALL_RISK_RULES or editing LAB_RANGES fails here instead of silently
+# changing clinical output.
+import itertools
+
+import numpy as np
+
+from diagnosis import risk
+
+REFERENCE_RANGES = {'TSH': (0.4, 4.0), 'T3': (0.8, 2.0), 'TT4': (5.0, 12.0)}
+
+
+def reference_lab_status(lab, value):
+    low, high = REFERENCE_RANGES[lab]
+    if value < low:
+        return 'Low'
+    if value > high:
+        return 'High'
+    return 'Normal'
+
+
+# prediction 1 is the hypothyroid class (N in Datasets/hypothyroid.csv)
+def reference_overall_risk(prediction, lab_risk, symptom_score=0):
+    if prediction == 1:  # Positive
+        if lab_risk >= 2 or symptom_score >= 5:
+            return "High"
+        return "Moderate"
+    if lab_risk >= 3 and symptom_score >= 6:
+        return "Moderate"
+    return "Low"
+
+
+# Each bound, just either side of it, and well outside the range
+def boundary_values(lab):
+    low, high = REFERENCE_RANGES[lab]
+    values = [0.0, low, high, 10 * high]
+    for bound in (low, high):
+        values += [np.nextafter(bound, -np.inf), np.nextafter(bound, np.inf)]
+    return sorted(values)
+
+
+def test_lab_statuses_match_reference():
+    grid = [boundary_values(lab) for lab in ('TSH', 'T3', 'TT4')]
+    for tsh, t3, tt4 in itertools.product(*grid):
+        expected = {lab: reference_lab_status(lab, value) for lab, value in zip(('TSH', 'T3', 'TT4'), (tsh, t3, tt4))}
+        assert risk.lab_statuses(tsh, t3, tt4) == expected
+        assert risk.lab_risk(tsh, t3, tt4) == sum(status != 'Normal' for status in expected.values())
+
+
+def test_overall_risk_matches_reference():
+    for prediction, lab_risk, symptom_score in itertools.product([0, 1], range(4), range(8)):
+        assert (risk.overall_risk(prediction, lab_risk, symptom_score)
+                == reference_overall_risk(prediction, lab_risk, symptom_score))
+
+
+def test_arrays_match_scalars():
+    grid = np.array(list(itertools.product(*[boundary_values(lab) for lab in ('TSH', 'T3', 'TT4')])))
+    lab_risk = risk.lab_risk_array(grid[:, 0], grid[:, 1], grid[:, 2])
+    assert lab_risk.tolist() == [risk.lab_risk(*row) for row in grid]
+
+    cases = np.array(list(itertools.product([0, 1], range(4), range(8))))
+    overall = risk.overall_risk_array(cases[:, 0], cases[:, 1], cases[:, 2])
+    assert overall.tolist() == [reference_overall_risk(*case) for case in cases]
+
+
+def test_missing_labs_count_as_normal():
+    assert risk.lab_risk_array(np.array([np.nan]), np.array([np.nan]), np.array([np.nan])).tolist() == [0]
+    assert risk.lab_risk_array(np.array([np.nan]), np.array([3.0]), np.array([1.0])).tolist() == [2]
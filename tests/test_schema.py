@@ -0,0 +1,17 @@
+# The schema encodes a raw CSV record exactly as the training matrix holds
+# it: the first row of each dataset, given as strings, matches row 0 of X.
+import numpy as np
+import pandas as pd
+import pytest
+
+from diagnosis.datasets import dataset_path, load_dataset
+from diagnosis.models import MODEL_FILES
+from diagnosis.schema import SCHEMAS
+
+
+@pytest.mark.parametrize('disease', list(MODEL_FILES))
+def test_first_row_matches_training_matrix(disease):
+    record = pd.read_csv(dataset_path(disease), encoding='utf-8-sig', dtype=str, keep_default_na=False,
+                         nrows=1).iloc[0].to_dict()
+    X, _, _ = load_dataset(disease)
+    np.testing.assert_array_equal(SCHEMAS[disease].row(record), X[0])
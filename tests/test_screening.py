@@ -0,0 +1,27 @@
+# Screening panels for clearly hypothyroid and clearly euthyroid patients:
+# the thyroid model's positive class is the hypothyroid one (N, coded 1).
+import warnings
+
+import pytest
+
+from diagnosis.models import load_model, score
+from diagnosis.screening import build_rows, risk_panel
+
+HYPOTHYROID = {'age': 50, 'sex': 'Female',
+               'thyroid': {'on thyroxine': 'f', 'TSH': 40.0, 'T3 measured': 't', 'T3': 1.0, 'TT4': 50.0}}
+EUTHYROID = {'age': 50, 'sex': 'Female',
+             'thyroid': {'on thyroxine': 'f', 'TSH': 1.3, 'T3 measured': 't', 'T3': 2.1, 'TT4': 104.0}}
+
+
+def thyroid_panel(record):
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    rows, _, _ = build_rows(record)
+    predictions, scores = score(load_model('thyroid'), rows['thyroid'].reshape(1, -1))
+    return risk_panel(rows, {'thyroid': (int(predictions[0]), float(scores[0]))})
+
+
+@pytest.mark.parametrize('record, detected', [(HYPOTHYROID, True), (EUTHYROID, False)])
+def test_thyroid_detection(record, detected):
+    panel = thyroid_panel(record)
+    assert panel['results']['thyroid']['detected'] is detected
+    assert ('thyroid' in panel['detected']) is detected
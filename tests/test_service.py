@@ -0,0 +1,73 @@
+# The ASGI service end to end, called directly as an ASGI app: known routes
+# answer 200, unknown routes and diseases 404, bad features 422.
+import asyncio
+import json
+
+from diagnosis.service import InferenceService
+from diagnosis.store import ResultStore
+
+HEART = [57, 0, 0, 120, 354, 0, 1, 163, 1, 0.6, 2, 0, 2]
+
+
+async def call(app, method, path, payload=None, query=b''):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({'type': 'http', 'method': method, 'path': path, 'query_string': query}, receive, send)
+    return messages[0]['status'], json.loads(messages[1]['body'])
+
+
+# Runs scenario(app) against a started service with a throwaway results database
+def serve(tmp_path, scenario):
+    async def run():
+        app = InferenceService(preload=False, workers=0, result_store=ResultStore(str(tmp_path / 'results.db')))
+        await app.startup()
+        try:
+            return await scenario(app)
+        finally:
+            await app.shutdown()
+
+    return asyncio.run(run())
+
+
+def requests(tmp_path, calls):
+    async def scenario(app):
+        return [await call(app, *args) for args in calls]
+
+    return serve(tmp_path, scenario)
+
+
+def test_routes(tmp_path):
+    (health, _), (predicted, result), (unknown, _), (missing, _) = requests(tmp_path, [
+        ('GET', '/health'),
+        ('POST', '/predict/heart_disease', {'features': HEART}),
+        ('POST', '/predict/gout', {'features': HEART}),
+        ('GET', '/nowhere'),
+    ])
+    assert (health, predicted, unknown, missing) == (200, 200, 404, 404)
+    assert result['disease'] == 'heart_disease' and result['prediction'] in (0, 1)
+
+
+def test_invalid_features(tmp_path):
+    statuses = [status for status, _ in requests(tmp_path, [
+        ('POST', '/predict/heart_disease', {'features': HEART[:-1]}),
+        ('POST', '/predict/heart_disease', {'features': [999] + HEART[1:]}),
+        ('POST', '/predict/heart_disease', {'features': ['x'] + HEART[1:]}),
+    ])]
+    assert statuses == [422, 422, 422]
+
+
+def test_history(tmp_path):
+    async def scenario(app):
+        await call(app, 'POST', '/predict/heart_disease', {'patient_id': 'p1', 'features': HEART})
+        app.store.flush()
+        return await call(app, 'GET', '/history/p1', None, b'disease=heart_disease')
+
+    status, body = serve(tmp_path, scenario)
+    assert status == 200 and [r['disease'] for r in body['results']] == ['heart_disease']
@@ -0,0 +1,14 @@
+# Scoring through the worker pool (batch -j 2) writes exactly what scoring
+# in-process does.
+import pytest
+
+from diagnosis.batch import main
+from diagnosis.datasets import dataset_path
+
+
+@pytest.mark.parametrize('disease', ['thyroid', 'parkinsons'])
+def test_pool_matches_in_process(disease, tmp_path):
+    in_process, pooled = tmp_path / 'in_process.csv', tmp_path / 'pooled.csv'
+    main([disease, dataset_path(disease), '-o', str(in_process), '--chunk-size', '1000'])
+    main([disease, dataset_path(disease), '-o', str(pooled), '--chunk-size', '1000', '-j', '2'])
+    assert pooled.read_text() == in_process.read_text()